@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Photobooth - a flexible photo booth software
+# Copyright (C) 2018  Balthasar Reuter <photobooth at re - web dot eu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare time and quality of the performance presets for assembly.
+
+Run from the top folder of the repository:
+
+    python -m benchmarks.presets
+
+Quality is reported as the structural similarity (SSIM) of the assembled
+picture compared to a reference made from full-size decoded shots, resized
+with LANCZOS and stored losslessly. Requires NumPy.
+"""
+
+import timeit
+
+from io import BytesIO
+
+import numpy
+
+from PIL import Image
+
+from benchmarks.rotation import synthetic_picture
+from photobooth.camera import Camera
+from photobooth.camera.CollageLayout import Slot
+from photobooth.camera.QualityPreset import presets
+
+
+def box_filter(a, size):
+
+    # Mean over size x size windows using summed area tables
+    s = numpy.pad(a, ((1, 0), (1, 0))).cumsum(0).cumsum(1)
+    return (s[size:, size:] - s[:-size, size:] - s[size:, :-size] +
+            s[:-size, :-size]) / (size * size)
+
+
+def ssim(a, b, size=8):
+
+    x = numpy.asarray(a.convert('L'), dtype=numpy.float64)
+    y = numpy.asarray(b.convert('L'), dtype=numpy.float64)
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+
+    mu_x, mu_y = box_filter(x, size), box_filter(y, size)
+    var_x = box_filter(x * x, size) - mu_x ** 2
+    var_y = box_filter(y * y, size) - mu_y ** 2
+    cov = box_filter(x * y, size) - mu_x * mu_y
+
+    s = (((2 * mu_x * mu_y + c1) * (2 * cov + c2)) /
+         ((mu_x ** 2 + mu_y ** 2 + c1) * (var_x + var_y + c2)))
+    return s.mean()
+
+
+def assemble(shots, size, preset):
+
+    collage = Image.new('RGB', (2 * size[0], 2 * size[1]), (255, 255, 255))
+    for i, data in enumerate(shots):
+        thumbnail = Camera._makeThumbnail(data, Slot((0, 0), size), 1,
+                                          preset)
+        collage.paste(thumbnail, ((i % 2) * size[0], (i // 2) * size[1]))
+
+    byte_data = BytesIO()
+    collage.save(byte_data, format='jpeg', **preset.outputParams)
+    return byte_data
+
+
+def reference(shots, size):
+
+    collage = Image.new('RGB', (2 * size[0], 2 * size[1]), (255, 255, 255))
+    for i, data in enumerate(shots):
+        shot = Image.open(BytesIO(data)).resize(size, Image.LANCZOS)
+        collage.paste(shot, ((i % 2) * size[0], (i // 2) * size[1]))
+    return collage
+
+
+def main():
+
+    shots = [synthetic_picture((6000, 4000)) for _ in range(4)]
+    size = (1728, 1151)
+    repeat = 3
+
+    ref = reference(shots, size)
+
+    print('{:<10}{:>12}{:>12}{:>8}'.format('Preset', 'Time [ms]',
+                                           'Size [kB]', 'SSIM'))
+    for name in ('fast', 'balanced', 'best'):
+        preset = presets[name]
+        time = min(timeit.repeat(lambda: assemble(shots, size, preset),
+                                 number=1, repeat=repeat))
+        byte_data = assemble(shots, size, preset)
+        value = ssim(ref, Image.open(byte_data))
+        print('{:<10}{:>12.1f}{:>12.1f}{:>8.4f}'.format(
+            name, time * 1000, len(byte_data.getvalue()) / 1024, value))
+
+
+if __name__ == '__main__':
+    main()
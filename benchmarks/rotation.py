@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Photobooth - a flexible photo booth software
+# Copyright (C) 2018  Balthasar Reuter <photobooth at re - web dot eu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare strategies to rotate captured JPEG pictures by 90 degree.
+
+Run from the top folder of the repository:
+
+    python -m benchmarks.rotation
+"""
+
+import timeit
+
+from io import BytesIO
+
+from PIL import Image
+
+from photobooth.Config import Config
+from photobooth.camera.CameraDummy import CameraDummy
+from photobooth.camera.Orientation import rotate_lossless, set_orientation
+
+
+def synthetic_picture(size):
+
+    # Noise and a gradient give a compression ratio similar to a photo
+    picture = Image.effect_noise(size, 64).convert('RGB')
+    gradient = Image.linear_gradient('L').resize(size).convert('RGB')
+    picture = Image.blend(picture, gradient, 0.5)
+
+    byte_data = BytesIO()
+    picture.save(byte_data, format='jpeg', quality=90)
+    return byte_data.getvalue()
+
+
+def reencode(data):
+
+    picture = Image.open(BytesIO(data)).transpose(Image.ROTATE_90)
+    byte_data = BytesIO()
+    picture.save(byte_data, format='jpeg')
+    return byte_data.getvalue()
+
+
+def exif(data):
+
+    return set_orientation(data, 8)
+
+
+def lossless(data):
+
+    return rotate_lossless(data, 90)
+
+
+def main():
+
+    dummy = CameraDummy(Config('photobooth.cfg'))
+    frames = (('dummy 1920x1280', dummy.getPictureBytes()[0]),
+              ('synthetic 6000x4000', synthetic_picture((6000, 4000))))
+    strategies = (('re-encode', reencode), ('EXIF tag', exif),
+                  ('jpegtran', lossless))
+    repeat = 5
+
+    print('{:<22}{:<12}{:>12}'.format('Frame', 'Strategy', 'Time [ms]'))
+    for frame_name, data in frames:
+        for name, func in strategies:
+            if func(data) is None:
+                print('{:<22}{:<12}{:>12}'.format(frame_name, name, 'n/a'))
+                continue
+            time = min(timeit.repeat(lambda: func(data), number=1,
+                                     repeat=repeat))
+            print('{:<22}{:<12}{:>12.1f}'.format(frame_name, name,
+                                                 time * 1000))
+
+
+if __name__ == '__main__':
+    main()
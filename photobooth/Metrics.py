@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Photobooth - a flexible photo booth software
+# Copyright (C) 2018  Balthasar Reuter <photobooth at re - web dot eu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+class Metrics:
+    """Counters, gauges and latency histograms named as in Prometheus.
+
+    Every process records into its own instance. The master process
+    periodically collects the values recorded since the last call of
+    takeUpdates() from all processes and merges them into a single
+    instance, which is rendered in the Prometheus text format. A disabled
+    instance records nothing.
+    """
+
+    prefix = 'photobooth_'
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+               10.0, 30.0)
+
+    def __init__(self, enabled=False):
+
+        super().__init__()
+
+        self._enabled = enabled
+        self._lock = threading.Lock()
+        self._reset()
+
+    def __getstate__(self):
+
+        # Locks cannot be pickled when starting processes via spawn
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _reset(self):
+
+        # Values are keyed by name and sorted label items, histograms hold
+        # the count per bucket (the last one is +Inf) and the sum
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    @property
+    def isEnabled(self):
+
+        return self._enabled
+
+    @staticmethod
+    def _key(name, labels):
+
+        return (name, tuple(sorted(labels.items())))
+
+    def count(self, name, value=1, **labels):
+
+        if not self._enabled:
+            return
+
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+
+        if not self._enabled:
+            return
+
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        """Add value (in seconds) to the histogram name"""
+
+        if not self._enabled:
+            return
+
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.setdefault(
+                key, [0] * (len(self.buckets) + 1) + [0.0])
+            histogram[index] += 1
+            histogram[-1] += value
+
+    @contextmanager
+    def time(self, name, **labels):
+        """Observe the time spent in the with-block in histogram name"""
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - start, **labels)
+
+    def takeUpdates(self):
+        """Return the values recorded since the last call, or None if there
+        are none
+        """
+
+        with self._lock:
+            if (len(self._counters) == 0 and len(self._gauges) == 0 and
+               len(self._histograms) == 0):
+                return None
+            updates = (self._counters, self._gauges, self._histograms)
+            self._reset()
+
+        return updates
+
+    def merge(self, updates):
+
+        counters, gauges, histograms = updates
+        with self._lock:
+            for key, value in counters.items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            self._gauges.update(gauges)
+            for key, values in histograms.items():
+                histogram = self._histograms.setdefault(
+                    key, [0] * len(values[:-1]) + [0.0])
+                for i, value in enumerate(values):
+                    histogram[i] += value
+
+    @staticmethod
+    def _formatLabels(labels, extra=()):
+
+        labels = tuple(labels) + tuple(extra)
+        if len(labels) == 0:
+            return ''
+
+        return '{' + ','.join('{}="{}"'.format(
+            name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+            for name, value in labels) + '}'
+
+    def render(self):
+        """Return all values in the Prometheus text exposition format"""
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(self._histograms.items())
+
+        lines = []
+        typed = set()
+
+        def addType(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append('# TYPE {}{} {}'.format(self.prefix, name, kind))
+
+        for (name, labels), value in counters:
+            addType(name, 'counter')
+            lines.append('{}{}{} {}'.format(
+                self.prefix, name, self._formatLabels(labels), value))
+
+        for (name, labels), value in gauges:
+            addType(name, 'gauge')
+            lines.append('{}{}{} {}'.format(
+                self.prefix, name, self._formatLabels(labels), value))
+
+        for (name, labels), values in histograms:
+            addType(name, 'histogram')
+            cumulative = 0
+            bounds = [str(b) for b in self.buckets] + ['+Inf']
+            for bound, value in zip(bounds, values):
+                cumulative += value
+                lines.append('{}{}_bucket{} {}'.format(
+                    self.prefix, name,
+                    self._formatLabels(labels, (('le', bound), )),
+                    cumulative))
+            lines.append('{}{}_sum{} {}'.format(
+                self.prefix, name, self._formatLabels(labels), values[-1]))
+            lines.append('{}{}_count{} {}'.format(
+                self.prefix, name, self._formatLabels(labels), cumulative))
+
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsExporter:
+    """Collects metrics from all processes in the master process.
+
+    They are served as Prometheus text on a local port or, if the port is
+    0, written to a file at a fixed interval.
+    """
+
+    def __init__(self, config, comm):
+
+        super().__init__()
+
+        self._comm = comm
+        self._metrics = Metrics(True)
+
+        self._address = config.get('Metrics', 'address')
+        self._port = config.getInt('Metrics', 'port')
+        self._filename = config.get('Metrics', 'filename')
+        self._interval = config.getFloat('Metrics', 'interval')
+
+        self._server = None
+        self._halt = threading.Event()
+        self._threads = []
+
+    def render(self):
+
+        # Queue depths are sampled when rendering
+        for worker, depth in self._comm.queueDepths().items():
+            self._metrics.gauge('queue_depth', depth, worker=worker.name)
+
+        return self._metrics.render()
+
+    def start(self):
+
+        self._threads.append(threading.Thread(target=self._collect,
+                                              daemon=True))
+
+        if self._port > 0:
+            try:
+                self._server = HTTPServer((self._address, self._port),
+                                          _handler_factory(self))
+            except OSError as e:
+                logging.error('Cannot serve metrics on %s:%d: %s',
+                              self._address, self._port, e)
+            else:
+                logging.info('Serving metrics on http://%s:%d/metrics',
+                             self._address, self._port)
+                self._threads.append(threading.Thread(
+                    target=self._server.serve_forever, daemon=True))
+        else:
+            logging.info('Writing metrics to "%s"', self._filename)
+            self._threads.append(threading.Thread(target=self._dump,
+                                                  daemon=True))
+
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+
+        self._halt.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+        for thread in self._threads:
+            thread.join()
+
+        # Collect what has been sent after the last poll
+        self._comm.collectMetrics(self._metrics.merge)
+        if self._server is None:
+            self._write()
+
+    def _collect(self):
+
+        while not self._halt.wait(0.5):
+            self._comm.collectMetrics(self._metrics.merge)
+
+    def _dump(self):
+
+        while not self._halt.wait(self._interval):
+            self._write()
+
+    def _write(self):
+
+        # Replace atomically so readers never see a partial file
+        tmp_file = self._filename + '.tmp'
+        try:
+            with open(tmp_file, 'w') as f:
+                f.write(self.render())
+            os.replace(tmp_file, self._filename)
+        except OSError as e:
+            logging.warn('Cannot write metrics to "%s": %s', self._filename,
+                         e)
+
+
+def _handler_factory(exporter):
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+
+            body = exporter.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type',
+                             'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+
+            logging.debug('MetricsHandler: ' + format, *args)
+
+    return MetricsHandler
@@ -58,9 +58,17 @@ class Context:
 
         logging.debug('Context: New state is "{}"'.format(new_state))
 
+        # A traced session ends when returning to idle
+        if isinstance(new_state, IdleState):
+            self._comm.stopTrace()
+
         self._state = new_state
         self._comm.bcast(self._state)
 
+    def share(self, picture):
+
+        return self._comm.shareBytes(picture)
+
     def handleEvent(self, event):
 
         if not isinstance(event, Event):
@@ -68,6 +76,12 @@ class Context:
 
         logging.debug('Context: Handling event "{}"'.format(event))
 
+        # Every session starts with the event that ends the idle state
+        if (isinstance(self.state, IdleState) and
+           not isinstance(event, TeardownEvent)):
+            self._comm.startTrace(event)
+            self._comm.metrics.count('sessions_total')
+
         if isinstance(event, ErrorEvent):
             self.state = ErrorState(event.origin, event.message, self.state,
                                     self.is_running)
@@ -84,7 +98,49 @@ class Context:
             self.state.handleEvent(event, self)
 
 
-class Event:
+class Traceable:
+    """Trace id and monotonic timestamps stamped by the Communicator"""
+
+    def __init__(self):
+
+        super().__init__()
+
+        self._trace_id = None
+        self._sent_time = None
+        self._received_time = None
+
+    @property
+    def traceId(self):
+
+        return self._trace_id
+
+    @traceId.setter
+    def traceId(self, trace_id):
+
+        self._trace_id = trace_id
+
+    @property
+    def sentTime(self):
+
+        return self._sent_time
+
+    @sentTime.setter
+    def sentTime(self, time):
+
+        self._sent_time = time
+
+    @property
+    def receivedTime(self):
+
+        return self._received_time
+
+    @receivedTime.setter
+    def receivedTime(self, time):
+
+        self._received_time = time
+
+
+class Event(Traceable):
 
     def __init__(self, name):
 
@@ -177,23 +233,29 @@ class GpioEvent(Event):
 
 class CameraEvent(Event):
 
-    def __init__(self, name, picture=None):
+    def __init__(self, name, picture=None, timestamp=None):
 
         super().__init__(name)
         self._picture = picture
+        self._timestamp = timestamp
 
     @property
     def picture(self):
 
         return self._picture
 
+    @property
+    def timestamp(self):
+
+        return self._timestamp
+
 
 class WorkerEvent(Event):
 
     pass
 
 
-class State:
+class State(Traceable):
 
     def __init__(self):
 
@@ -429,7 +491,8 @@ class AssembleState(State):
     def handleEvent(self, event, context):
 
         if isinstance(event, CameraEvent) and event.name == 'review':
-            context.state = ReviewState(event.picture)
+            # The assembled picture is broadcast by reference
+            context.state = ReviewState(context.share(event.picture))
         else:
             raise TypeError('Unknown Event type "{}"'.format(event))
 
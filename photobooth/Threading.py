@@ -17,43 +17,335 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+import logging
+import queue
+import threading
+import time
+
 from enum import IntEnum
-from multiprocessing import Queue
+from io import BytesIO
+from multiprocessing import Queue, Value
+
+from .Metrics import Metrics
+from .Tracer import Tracer
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python < 3.8 does not provide shared memory, fall back to queues
+    shared_memory = None
 
 
 class Communicator:
 
-    def __init__(self):
+    def __init__(self, preview_size=None):
 
         super().__init__()
 
         self._queues = [Queue() for _ in Workers]
 
+        # Message classes each worker receives, all if not given, and
+        # counts of delivered and filtered messages sent by this process
+        self._subscriptions = {}
+        self._delivery_stats = {worker: [0, 0] for worker in Workers}
+
+        # Shared memory segments created by this process via shareBytes
+        self._shared = []
+
+        self._tracer = Tracer()
+
+        # Metrics recorded by each process are sent to the master via queue
+        self._metrics = Metrics()
+        self._metrics_queue = None
+
+        if preview_size is not None and shared_memory is not None:
+            self._frame_ring = FrameRing(3, preview_size)
+        else:
+            self._frame_ring = None
+
+        # Conflating channels that keep only the newest message per key
+        self._latest = {(Workers.GUI, 'preview'): LatestChannel()}
+
+        # Smoothed latency from preview acquisition to display in seconds,
+        # written by the Gui only
+        self._preview_latency = Value('d', 0.0, lock=False)
+
+    @property
+    def frameRing(self):
+
+        return self._frame_ring
+
+    @property
+    def tracer(self):
+
+        return self._tracer
+
+    def enableTracing(self, basedir):
+        """Record traces of sessions in basedir. Must be called before the
+        worker processes are started.
+        """
+
+        self._tracer = Tracer(basedir)
+
+    def startTrace(self, message):
+        """Begin a new traced session with the received message"""
+
+        trace_id = self._tracer.start()
+        if trace_id is not None and message.sentTime is not None:
+            message.traceId = trace_id
+            self._tracer.addSpan('queue wait', message.sentTime,
+                                 message.receivedTime, message=str(message))
+
+    def stopTrace(self):
+
+        self._tracer.traceId = None
+
+    def trace(self, name, **args):
+        """Return a context manager that records a span of the current
+        session
+        """
+
+        return self._tracer.span(name, **args)
+
+    def _stamp(self, message):
+
+        # Events and states carry a trace id and timestamps
+        if hasattr(message, 'traceId'):
+            if message.traceId is None:
+                message.traceId = self._tracer.traceId
+            message.sentTime = time.monotonic()
+
+    def _received(self, worker, message):
+
+        if self._tracer.processName is None:
+            self._tracer.processName = worker.name.title()
+
+        # Messages that did not pass send or bcast are not stamped
+        if hasattr(message, 'traceId') and message.sentTime is not None:
+            message.receivedTime = time.monotonic()
+            self._tracer.traceId = message.traceId
+            self._tracer.addSpan('queue wait', message.sentTime,
+                                 message.receivedTime, message=str(message))
+
+    @property
+    def metrics(self):
+
+        return self._metrics
+
+    def enableMetrics(self):
+        """Record metrics in all processes. Must be called before the
+        worker processes are started.
+        """
+
+        self._metrics = Metrics(True)
+        self._metrics_queue = Queue()
+
+    def flushMetrics(self):
+        """Send the metrics recorded since the last flush to the master"""
+
+        updates = self._metrics.takeUpdates()
+        if updates is not None:
+            self._metrics_queue.put(updates)
+
+    def collectMetrics(self, merge):
+        """Pass all metric updates sent by flushMetrics to merge"""
+
+        if self._metrics_queue is None:
+            return
+
+        while True:
+            try:
+                merge(self._metrics_queue.get_nowait())
+            except queue.Empty:
+                return
+
+    def queueDepths(self):
+        """Return the number of pending messages per worker, if the
+        platform supports it
+        """
+
+        depths = {}
+        for worker in Workers:
+            try:
+                depths[worker] = self._queues[worker].qsize()
+            except NotImplementedError:
+                pass
+        return depths
+
+    @property
+    def previewLatency(self):
+
+        return self._preview_latency.value
+
+    def reportPreviewLatency(self, latency):
+
+        average = self._preview_latency.value
+        if average > 0:
+            latency = 0.8 * average + 0.2 * latency
+        self._preview_latency.value = latency
+
+    def close(self):
+
+        if self._frame_ring is not None:
+            self._frame_ring.close(unlink=True)
+            self._frame_ring = None
+
+        for shared in self._shared:
+            shared.unlink()
+        self._shared = []
+
+        for worker in Workers:
+            logging.debug('Communicator: %s delivered %d, filtered %d',
+                          worker.name, *self.deliveryStats(worker))
+
+    def subscribe(self, worker, classes):
+        """Deliver only messages that are instances of classes to worker.
+        Must be called before the worker processes are started.
+        """
+
+        if not isinstance(worker, Workers):
+            raise TypeError('worker must be a member of Workers')
+
+        self._subscriptions[worker] = tuple(classes)
+
+    def isSubscribed(self, worker, message):
+
+        # The sentinel None that ends iter is always delivered
+        return (message is None or worker not in self._subscriptions or
+                isinstance(message, self._subscriptions[worker]))
+
+    def deliveryStats(self, worker):
+
+        if not isinstance(worker, Workers):
+            raise TypeError('worker must be a member of Workers')
+
+        return tuple(self._delivery_stats[worker])
+
+    def _deliver(self, worker, message):
+
+        if self.isSubscribed(worker, message):
+            self._queues[worker].put(message)
+            self._delivery_stats[worker][0] += 1
+            self._metrics.count('messages_total', worker=worker.name,
+                                result='delivered')
+            return True
+        else:
+            self._delivery_stats[worker][1] += 1
+            self._metrics.count('messages_total', worker=worker.name,
+                                result='filtered')
+            return False
+
     def bcast(self, message):
 
-        for q in self._queues[1:]:
-            q.put(message)
+        self._stamp(message)
+        delivered = [worker.name for worker in list(Workers)[1:]
+                     if self._deliver(worker, message)]
+        logging.debug('Communicator: Broadcast %s to %s', message,
+                      ', '.join(delivered))
+
+    def shareBytes(self, data, keep=4, min_size=65536):
+        """Copy data (a BytesIO) into shared memory once and return a
+        SharedBytes handle that is pickled by reference. Receivers get a
+        SharedBytesReader that behaves like a BytesIO and copies the data
+        only when it is used.
+
+        Segments are removed once all receivers have used or dropped their
+        reader. At most keep segments that are still in use are kept, in
+        case a receiver never releases its reader, all are removed by
+        close(). Small payloads are returned unchanged.
+        """
+
+        buf = data.getbuffer()
+        if shared_memory is None or len(buf) < min_size:
+            return data
+
+        # Segments of earlier calls have been sent by now
+        for shared in [s for s in self._shared if s.isReleased]:
+            shared.unlink()
+            self._shared.remove(shared)
+        while len(self._shared) >= keep:
+            shared = self._shared.pop(0)
+            logging.warn('Communicator: Removing %s still in use', shared)
+            shared.unlink()
+
+        shared = SharedBytes.create(buf)
+        self._shared.append(shared)
+        return shared
 
     def send(self, target, message):
 
         if not isinstance(target, Workers):
             raise TypeError('target must be a member of Workers')
 
-        self._queues[target].put(message)
+        self._stamp(message)
+        if not self._deliver(target, message):
+            logging.debug('Communicator: %s not subscribed to %s, dropped',
+                          target.name, message)
+
+    def sendLatest(self, target, key, message):
+        """Send message to target, superseding previous messages for the
+        same key that have not been handled yet. The receiver gets a
+        LatestMessage and must unwrap it via recvLatest.
+        """
+
+        if not isinstance(target, Workers):
+            raise TypeError('target must be a member of Workers')
+
+        try:
+            channel = self._latest[(target, key)]
+        except KeyError:
+            raise ValueError('No latest channel "{}" for {}'.format(
+                key, target))
+
+        self._stamp(message)
+        self._queues[target].put(LatestMessage(key, channel.publish(),
+                                               message))
+
+    def recvLatest(self, worker, latest):
+        """Return the message wrapped in latest, or None if a newer one for
+        the same key has been sent in the meantime
+        """
+
+        if not isinstance(worker, Workers):
+            raise TypeError('worker must be a member of Workers')
+
+        if not self._latest[(worker, latest.key)].isNewest(latest.seq):
+            return None
+
+        self._received(worker, latest.message)
+        return latest.message
+
+    def latestStats(self, worker, key):
+
+        if not isinstance(worker, Workers):
+            raise TypeError('worker must be a member of Workers')
+
+        return self._latest[(worker, key)].stats
 
     def recv(self, worker, block=True):
 
         if not isinstance(worker, Workers):
             raise TypeError('worker must be a member of Workers')
 
-        return self._queues[worker].get(block)
+        message = self._queues[worker].get(block)
+        self._received(worker, message)
+        return message
 
     def iter(self, worker):
 
         if not isinstance(worker, Workers):
             raise TypeError('worker must be a member of Workers')
 
-        return iter(self._queues[worker].get, None)
+        return self._iter(worker)
+
+    def _iter(self, worker):
+
+        for message in iter(self._queues[worker].get, None):
+            self._received(worker, message)
+            yield message
+            # Report what was recorded while handling the message before
+            # waiting for the next one
+            self.flushMetrics()
 
     def empty(self, worker):
 
@@ -63,6 +355,289 @@ class Communicator:
         return self._queues[worker].empty()
 
 
+class SharedBytes:
+    """Handle to bytes in shared memory, owned by the creating process.
+
+    Sending it to another process pickles only the name of the segment and
+    a reader slot. The receiver unpickles it as a SharedBytesReader, which
+    marks its slot in the header of the segment once it is done with it.
+    """
+
+    # Number of receivers whose release is tracked
+    slots = 16
+
+    def __init__(self, shm, size):
+
+        super().__init__()
+
+        self._shm = shm
+        self._size = size
+        self._readers = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, buf):
+
+        shm = shared_memory.SharedMemory(create=True,
+                                         size=cls.slots + len(buf))
+        shm.buf[:cls.slots] = bytes(cls.slots)
+        shm.buf[cls.slots:cls.slots + len(buf)] = buf
+        return cls(shm, len(buf))
+
+    def __str__(self):
+
+        return 'SharedBytes({}, {})'.format(self._shm.name, self._size)
+
+    def __reduce__(self):
+
+        # Every message is pickled once per receiving queue
+        with self._lock:
+            slot = self._readers if self._readers < self.slots else None
+            self._readers += 1
+
+        return (SharedBytesReader, (self._shm.name, self._size, slot))
+
+    @property
+    def isReleased(self):
+
+        with self._lock:
+            if self._readers > self.slots:
+                return False
+            return all(self._shm.buf[:self._readers])
+
+    def unlink(self):
+
+        self._shm.close()
+        self._shm.unlink()
+
+
+class SharedBytesReader:
+    """Receiving end of SharedBytes.
+
+    It only attaches to the segment when it is used like a BytesIO, e.g.,
+    by Image.open or getbuffer(). Receivers that ignore the data never copy
+    it.
+    """
+
+    def __init__(self, name, size, slot):
+
+        super().__init__()
+
+        self._name = name
+        self._size = size
+        self._slot = slot
+        self._data = None
+
+    def __str__(self):
+
+        return 'SharedBytesReader({}, {})'.format(self._name, self._size)
+
+    def __getattr__(self, name):
+
+        # Only called for attributes not defined here, i.e., of the BytesIO
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        return getattr(self._load(), name)
+
+    def __del__(self):
+
+        # Readers that were never used release their slot when dropped
+        if self._data is None and self._slot is not None:
+            try:
+                shm = shared_memory.SharedMemory(name=self._name)
+            except FileNotFoundError:
+                return
+            self._release(shm)
+
+    def _release(self, shm):
+
+        if self._slot is not None:
+            shm.buf[self._slot] = 1
+        shm.close()
+
+    def _load(self):
+
+        if self._data is None:
+            try:
+                shm = shared_memory.SharedMemory(name=self._name)
+            except FileNotFoundError:
+                raise RuntimeError('Shared picture {} was removed before it '
+                                   'was read'.format(self._name))
+
+            start = SharedBytes.slots
+            self._data = BytesIO(bytes(shm.buf[start:start + self._size]))
+            self._release(shm)
+
+        return self._data
+
+
+class LatestMessage:
+
+    def __init__(self, key, seq, message):
+
+        super().__init__()
+        self._key = key
+        self._seq = seq
+        self._message = message
+
+    def __str__(self):
+
+        return 'LatestMessage({}, {})'.format(self._key, self._seq)
+
+    @property
+    def key(self):
+
+        return self._key
+
+    @property
+    def seq(self):
+
+        return self._seq
+
+    @property
+    def message(self):
+
+        return self._message
+
+
+class LatestChannel:
+    """Tracks the newest of the messages sent for a key across processes.
+
+    Messages travel through the regular queue of the receiver, tagged with
+    an increasing sequence number. Only the number of the newest message is
+    kept in shared memory, so that the receiver can skip messages that were
+    superseded while it was busy. There must be a single sender and a single
+    receiver, which keep the counts of sent and dropped messages.
+    """
+
+    def __init__(self):
+
+        super().__init__()
+
+        self._seq = Value('Q', 0, lock=False)
+        self._dropped = Value('Q', 0, lock=False)
+
+    @property
+    def stats(self):
+
+        return self._seq.value, self._dropped.value
+
+    def publish(self):
+        """Return the sequence number of a new message"""
+
+        self._seq.value += 1
+        return self._seq.value
+
+    def isNewest(self, seq):
+
+        if seq < self._seq.value:
+            self._dropped.value += 1
+            return False
+
+        return True
+
+
+class SharedFrame:
+
+    def __init__(self, slot, seq, size):
+
+        super().__init__()
+
+        self._slot = slot
+        self._seq = seq
+        self._size = size
+
+    def __str__(self):
+
+        return 'SharedFrame({}, {})'.format(self._slot, self._seq)
+
+    @property
+    def slot(self):
+
+        return self._slot
+
+    @property
+    def seq(self):
+
+        return self._seq
+
+    @property
+    def size(self):
+
+        return self._size
+
+
+class FrameRing:
+    """A ring of raw RGB frame buffers in shared memory.
+
+    The producer writes a picture into a free slot and hands the returned
+    SharedFrame to the consumer, which reads the pixels in place and
+    releases the slot once it no longer needs them.
+    """
+
+    def __init__(self, num_slots, max_size):
+
+        super().__init__()
+
+        self._slot_size = max_size[0] * max_size[1] * 3
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=num_slots * self._slot_size)
+        self._free = Queue()
+        for slot in range(num_slots):
+            self._free.put(slot)
+        self._seq = 0
+
+        logging.debug('Allocated %d preview frame buffers of %d bytes',
+                      num_slots, self._slot_size)
+
+    def close(self, unlink=False):
+
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+
+    def put(self, picture, timeout=0.1):
+        """Copy picture (a PIL image or an RGB array of shape (h, w, 3)) into
+        a free slot and return the corresponding SharedFrame, or None if no
+        slot became free within timeout.
+        """
+
+        if hasattr(picture, 'shape'):
+            size = (picture.shape[1], picture.shape[0])
+            data = memoryview(picture).cast('B')
+        else:
+            if picture.mode != 'RGB':
+                picture = picture.convert('RGB')
+            size = picture.size
+            data = picture.tobytes()
+
+        if len(data) > self._slot_size:
+            raise ValueError('Picture exceeds frame buffer size')
+
+        try:
+            slot = self._free.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+        offset = slot * self._slot_size
+        self._shm.buf[offset:offset + len(data)] = data
+        self._seq += 1
+        return SharedFrame(slot, self._seq, size)
+
+    def view(self, frame):
+        """Return a memoryview on the pixels of frame"""
+
+        offset = frame.slot * self._slot_size
+        length = frame.size[0] * frame.size[1] * 3
+        return self._shm.buf[offset:offset + length]
+
+    def release(self, frame):
+        """Hand the slot of frame back to the producer"""
+
+        self._free.put(frame.slot)
+
+
 class Workers(IntEnum):
 
     MASTER = 0
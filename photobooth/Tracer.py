@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Photobooth - a flexible photo booth software
+# Copyright (C) 2018  Balthasar Reuter <photobooth at re - web dot eu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import logging
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+
+
+class Tracer:
+    """Records spans of a session as Chrome trace events.
+
+    Each session has its own file in basedir, which all processes append
+    to. It uses the JSON array format without the closing bracket, which
+    timeline viewers accept and which allows appending. Timestamps are
+    taken from the monotonic clock, which is shared by all processes.
+    Without basedir, nothing is recorded.
+    """
+
+    def __init__(self, basedir=None):
+
+        super().__init__()
+
+        self._basedir = basedir
+        self._trace_id = None
+        self._process_name = None
+        self._named = set()
+
+    @property
+    def isEnabled(self):
+
+        return self._basedir is not None
+
+    @property
+    def traceId(self):
+
+        return self._trace_id
+
+    @traceId.setter
+    def traceId(self, trace_id):
+
+        self._trace_id = trace_id
+
+    @property
+    def processName(self):
+
+        return self._process_name
+
+    @processName.setter
+    def processName(self, name):
+
+        self._process_name = name
+
+    def _filename(self, trace_id):
+
+        return os.path.join(self._basedir, 'trace_{}.json'.format(trace_id))
+
+    def start(self):
+        """Begin a new session and return its trace id"""
+
+        if not self.isEnabled:
+            return None
+
+        self._trace_id = time.strftime('%Y%m%d-%H%M%S')
+        os.makedirs(self._basedir, exist_ok=True)
+        with open(self._filename(self._trace_id), 'w') as f:
+            f.write('[\n')
+        logging.debug('Tracer: Recording session %s', self._trace_id)
+        return self._trace_id
+
+    def _write(self, trace_id, events):
+
+        with open(self._filename(trace_id), 'a') as f:
+            f.write(''.join(json.dumps(e) + ',\n' for e in events))
+
+    def addSpan(self, name, start, end, trace_id=None, **args):
+        """Record a span between the monotonic times start and end"""
+
+        trace_id = trace_id or self._trace_id
+        if not self.isEnabled or trace_id is None:
+            return
+
+        pid = os.getpid()
+        events = []
+        if (pid, trace_id) not in self._named:
+            self._named.add((pid, trace_id))
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pid,
+                           'args': {'name': self._process_name or str(pid)}})
+
+        events.append({'name': name, 'ph': 'X', 'pid': pid,
+                       'tid': threading.get_ident(),
+                       'ts': int(start * 1e6),
+                       'dur': max(int((end - start) * 1e6), 0),
+                       'args': args})
+        try:
+            self._write(trace_id, events)
+        except OSError as e:
+            logging.warn('Tracer: Cannot write span "%s": %s', name, e)
+
+    @contextmanager
+    def span(self, name, **args):
+        """Record the time spent in the with-block as a span"""
+
+        trace_id = self._trace_id
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.addSpan(name, start, time.monotonic(), trace_id, **args)
@@ -27,25 +27,39 @@ from .CameraInterface import CameraInterface
 
 class CameraDummy(CameraInterface):
 
-    def __init__(self):
+    def __init__(self, config):
 
         super().__init__()
 
         self.hasPreview = True
         self.hasIdle = False
         self._size = (1920, 1280)
+        self._preview_size = self._size
 
         self._hue = 0
 
         logging.info('Using CameraDummy')
 
+    def getCaptureSize(self):
+
+        return self._size
+
+    def setPreviewSize(self, size):
+
+        self._preview_size = tuple(size)
+        return True
+
     def getPreview(self):
 
-        return self.getPicture()
+        return self._createPicture(self._preview_size)
 
     def getPicture(self):
 
+        return self._createPicture(self._size)
+
+    def _createPicture(self, size):
+
         self._hue = (self._hue + 1) % 360
         r, g, b = hsv_to_rgb(self._hue / 360, .2, .9)
-        return Image.new('RGB', self._size, (int(r * 255), int(g * 255),
-                                             int(b * 255)))
+        return Image.new('RGB', size, (int(r * 255), int(g * 255),
+                                       int(b * 255)))
@@ -19,6 +19,7 @@
 
 import io
 import logging
+import time
 
 from PIL import Image
 
@@ -29,7 +30,7 @@ from .CameraInterface import CameraInterface
 
 class CameraGphoto2(CameraInterface):
 
-    def __init__(self):
+    def __init__(self, config):
 
         super().__init__()
 
@@ -38,6 +39,9 @@ class CameraGphoto2(CameraInterface):
 
         logging.info('Using python-gphoto2 bindings')
 
+        # Last value applied per config key
+        self._config_cache = {}
+
         self._setupLogging()
         self._setupCamera()
 
@@ -62,7 +66,8 @@ class CameraGphoto2(CameraInterface):
 
         # read model specific configuration
         config = self._cap.get_config()
-        self.loadConfig(config.get_child_by_name('cameramodel').get_value())
+        self.modelName = config.get_child_by_name('cameramodel').get_value()
+        self.loadConfig(self.modelName)
 
         # set startup configuration
         self._changeConfig('Startup')
@@ -107,19 +112,54 @@ class CameraGphoto2(CameraInterface):
 
     def _changeConfig(self, state):
 
-        if self.config[state]:
-            config = self._cap.get_config()
+        if not self.config[state]:
+            return
+
+        start = time.monotonic()
+
+        # Skip keys that are already set to the requested value
+        changes = {key: value for key, value in self.config[state].items()
+                   if self._config_cache.get(key, '').lower() != value.lower()}
+        if len(changes) == 0:
+            logging.debug('CameraGphoto2: Config for state "%s" unchanged',
+                          state)
+            return
+
+        try:
+            self._setSingleConfig(changes)
+        except (AttributeError, gp.GPhoto2Error) as e:
+            logging.debug(('CameraGphoto2: Changing single config values '
+                           'failed ({}), applying full config').format(e))
+            self._setFullConfig(state, changes)
+
+        logging.debug('CameraGphoto2: Applying config for state "%s" (%s) '
+                      'took %.3fs', state, ', '.join(changes),
+                      time.monotonic() - start)
+
+    def _setSingleConfig(self, changes):
+
+        for key, value in changes.items():
+            widget = self._cap.get_single_config(key)
+            if widget.get_value().lower() != value.lower():
+                widget.set_value(value)
+                self._cap.set_single_config(key, widget)
+            self._config_cache[key] = value
+
+    def _setFullConfig(self, state, changes):
 
-            for key in self.config[state]:
-                val = config.get_child_by_name(key)
-                if val.get_value().lower() != self.config[state][key].lower():
-                    val.set_value(self.config[state][key])
+        config = self._cap.get_config()
+
+        for key, value in changes.items():
+            val = config.get_child_by_name(key)
+            if val.get_value().lower() != value.lower():
+                val.set_value(value)
 
-            try:
-                self._cap.set_config(config)
-            except BaseException as e:
-                logging.warn(('CameraGphoto2: Applying config for state '
-                              '"{}" failed: {}').format(state, e))
+        try:
+            self._cap.set_config(config)
+            self._config_cache.update(changes)
+        except BaseException as e:
+            logging.warn(('CameraGphoto2: Applying config for state '
+                          '"{}" failed: {}').format(state, e))
 
     def setActive(self):
 
@@ -129,6 +169,16 @@ class CameraGphoto2(CameraInterface):
 
         self._changeConfig('Idle')
 
+    def getCaptureSize(self):
+
+        try:
+            value = self._cap.get_config().get_child_by_name(
+                'imagesize').get_value()
+        except gp.GPhoto2Error:
+            return None
+
+        return self._parseSize(value)
+
     def getPreview(self):
 
         camera_file = self._cap.capture_preview()
@@ -137,8 +187,12 @@ class CameraGphoto2(CameraInterface):
 
     def getPicture(self):
 
+        return Image.open(io.BytesIO(self.getPictureBytes()[0]))
+
+    def getPictureBytes(self):
+
         file_path = self._cap.capture(gp.GP_CAPTURE_IMAGE)
         camera_file = self._cap.file_get(file_path.folder, file_path.name,
                                          gp.GP_FILE_TYPE_NORMAL)
         file_data = camera_file.get_data_and_size()
-        return Image.open(io.BytesIO(file_data))
+        return bytes(file_data), 1
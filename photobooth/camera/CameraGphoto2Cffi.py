@@ -29,7 +29,7 @@ from .CameraInterface import CameraInterface
 
 class CameraGphoto2Cffi(CameraInterface):
 
-    def __init__(self):
+    def __init__(self, config):
 
         super().__init__()
 
@@ -54,6 +54,7 @@ class CameraGphoto2Cffi(CameraInterface):
     def _setupCamera(self):
 
         self._cap = gp.Camera()
+        self.modelName = self._cap.model_name
         logging.info('Supported operations: %s',
                      self._cap.supported_operations)
 
@@ -120,6 +121,15 @@ class CameraGphoto2Cffi(CameraInterface):
         except BaseException as e:
             logging.warn('Cannot set camera output to idle: {}.'.format(e))
 
+    def getCaptureSize(self):
+
+        try:
+            value = self._cap.config['imgsettings']['imagesize'].value
+        except BaseException:
+            return None
+
+        return self._parseSize(value)
+
     def getPreview(self):
 
         return Image.open(io.BytesIO(self._cap.get_preview()))
@@ -127,3 +137,7 @@ class CameraGphoto2Cffi(CameraInterface):
     def getPicture(self):
 
         return Image.open(io.BytesIO(self._cap.capture()))
+
+    def getPictureBytes(self):
+
+        return bytes(self._cap.capture()), 1
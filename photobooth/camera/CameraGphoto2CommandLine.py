@@ -17,9 +17,13 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+import io
 import logging
 import os
+import re
+import shutil
 import subprocess
+import tempfile
 
 from PIL import Image
 
@@ -28,35 +32,110 @@ from .CameraInterface import CameraInterface
 
 class CameraGphoto2CommandLine(CameraInterface):
 
-    def __init__(self):
+    def __init__(self, config):
 
         super().__init__()
 
-        self.hasPreview = False
+        self.hasPreview = True
         self.hasIdle = False
 
         logging.info('Using gphoto2 via command line')
 
         if os.access('/dev/shm', os.W_OK):
-            logging.debug('Storing temp files to "/dev/shm/photobooth.jpg"')
-            self._tmp_filename = '/dev/shm/photobooth.jpg'
+            tmp_dir = '/dev/shm'
         else:
-            logging.debug('Storing temp files to "/tmp/photobooth.jpg"')
-            self._tmp_filename = '/tmp/photobooth.jpg'
+            tmp_dir = None
+        self._tmp_dir = tempfile.mkdtemp(prefix='photobooth-', dir=tmp_dir)
+        logging.debug('Storing temp files to "{}"'.format(self._tmp_dir))
 
+        self._shell = None
         self.setActive()
 
+    def cleanup(self):
+
+        if self._shell is not None:
+            try:
+                self._shell.communicate(b'exit\n', timeout=5)
+            except subprocess.TimeoutExpired:
+                self._shell.kill()
+            self._shell = None
+
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
     def setActive(self):
 
-        self._callGphoto('-a', '/dev/null')
+        # The camera is detected once when the shell starts
+        if self._shell is None or self._shell.poll() is not None:
+            logging.debug('Starting gphoto2 shell')
+            env = dict(os.environ, LANG='C', LC_ALL='C')
+            self._shell = subprocess.Popen(
+                ['gphoto2', '--shell', '--force-overwrite'],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT, cwd=self._tmp_dir, env=env)
+            self._callGphoto('')
+
+    def getCaptureSize(self):
+
+        try:
+            output = self._callGphoto('get-config imagesize')
+        except RuntimeError:
+            return None
+
+        return next((self._parseSize(line) for line in output
+                     if line.startswith('Current:')), None)
+
+    def getPreview(self):
+
+        return Image.open(io.BytesIO(self._download('capture-preview')))
 
     def getPicture(self):
 
-        self._callGphoto('--capture-image-and-download', self._tmp_filename)
-        return Image.open(self._tmp_filename)
+        return Image.open(io.BytesIO(self.getPictureBytes()[0]))
 
-    def _callGphoto(self, action, filename):
+    def getPictureBytes(self):
+
+        return self._download('capture-image-and-download'), 1
+
+    def _download(self, action):
+
+        output = self._callGphoto(action)
+        files = [m.group(1) for m in map(re.compile(
+            r'Saving file as (.+)$').search, output) if m is not None]
+        if len(files) == 0:
+            raise RuntimeError('gphoto2 did not save a file: {}'.format(
+                ' '.join(output)))
+
+        filename = os.path.join(self._tmp_dir, files[-1].strip())
+        with open(filename, 'rb') as f:
+            data = f.read()
+        os.remove(filename)
+        return data
+
+    def _callGphoto(self, action):
+
+        self.setActive()
 
-        cmd = 'gphoto2 --force-overwrite --quiet {} --filename {}'
-        return subprocess.check_output(cmd.format(action, filename),
-                                       shell=True, stderr=subprocess.STDOUT)
+        # Changing the local directory prints a line that marks the end of
+        # the output of the previous command
+        cmd = '{}\nlcd {}\n'.format(action, self._tmp_dir)
+        self._shell.stdin.write(cmd.encode())
+        self._shell.stdin.flush()
+
+        output = []
+        while True:
+            line = self._shell.stdout.readline()
+            if len(line) == 0:
+                self._shell = None
+                raise RuntimeError('gphoto2 shell exited: {}'.format(
+                    ' '.join(output)))
+
+            line = line.decode(errors='replace').rstrip()
+            if 'Local directory now' in line:
+                break
+            output.append(line)
+
+        errors = [line for line in output if '*** Error' in line]
+        if len(errors) > 0:
+            raise RuntimeError('gphoto2: {}'.format(' '.join(errors)))
+
+        return output
@@ -20,6 +20,9 @@
 import configparser
 import logging
 import os
+import re
+
+from io import BytesIO
 
 
 class CameraInterface:
@@ -28,6 +31,7 @@ class CameraInterface:
 
         self.hasPreview = False
         self.hasIdle = False
+        self.modelName = type(self).__name__
         self._initConfig()
 
     def __enter__(self):
@@ -68,6 +72,19 @@ class CameraInterface:
 
         self._has_idle = value
 
+    @property
+    def modelName(self):
+
+        return self._model_name
+
+    @modelName.setter
+    def modelName(self, value):
+
+        if not isinstance(value, str):
+            raise ValueError('Expected str')
+
+        self._model_name = value
+
     @property
     def config(self):
         return self._cfg
@@ -86,6 +103,16 @@ class CameraInterface:
 
         raise NotImplementedError()
 
+    def setPreviewSize(self, size):
+        """Request preview frames of the given size.
+
+        Returns True if the camera delivers frames of that size, False if
+        they have to be resized afterwards. Cameras that cannot scale
+        previews natively ignore the request.
+        """
+
+        return False
+
     def getPreview(self):
 
         if not self.hasPreview:
@@ -97,6 +124,25 @@ class CameraInterface:
 
         raise NotImplementedError()
 
+    def getCaptureSize(self):
+        """Return the size of pictures returned by getPicture without taking
+        one, or None if the camera cannot tell.
+        """
+
+        return None
+
+    def getPictureBytes(self):
+        """Return a picture as encoded JPEG data together with the EXIF
+        orientation of the stored pixels.
+
+        Backends that receive JPEG data from the camera should override this
+        to return it unchanged.
+        """
+
+        byte_data = BytesIO()
+        self.getPicture().save(byte_data, format='jpeg')
+        return byte_data.getvalue(), 1
+
     def _initConfig(self):
 
         self._cfg = configparser.ConfigParser(interpolation=None)
@@ -104,6 +150,14 @@ class CameraInterface:
                                 'defaults.cfg')
         self._cfg.read(filename)
 
+    @staticmethod
+    def _parseSize(value):
+
+        match = re.search(r'(\d+)\s*x\s*(\d+)', str(value))
+        if match is None:
+            return None
+        return int(match.group(1)), int(match.group(2))
+
     def loadConfig(self, model):
 
         name = ''.join(c for c in model.lower() if c.isalnum()) + '.cfg'
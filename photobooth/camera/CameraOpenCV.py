@@ -18,17 +18,19 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+import threading
 
 from PIL import Image
 
 import cv2
 
 from .CameraInterface import CameraInterface
+from .LatestFrame import LatestFrame
 
 
 class CameraOpenCV(CameraInterface):
 
-    def __init__(self):
+    def __init__(self, config):
 
         super().__init__()
 
@@ -37,7 +39,23 @@ class CameraOpenCV(CameraInterface):
 
         logging.info('Using OpenCV')
 
+        self._buffer_size = config.getInt('Camera', 'buffer_size')
+        self._requested_size = (config.getInt('Camera', 'capture_width'),
+                                config.getInt('Camera', 'capture_height'))
+        self._fourcc = config.get('Camera', 'fourcc').strip()
+
         self._cap = cv2.VideoCapture()
+        self._preview_size = None
+
+        # Frames are grabbed continuously in a separate thread and only the
+        # newest one is kept, so that no stale frames queue up in the driver
+        self._latest = LatestFrame()
+        self._grabber = None
+        self._is_grabbing = False
+
+    def cleanup(self):
+
+        self.setIdle()
 
     def setActive(self):
 
@@ -45,23 +63,82 @@ class CameraOpenCV(CameraInterface):
             self._cap.open(0)
             if not self._cap.isOpened():
                 raise RuntimeError('Camera could not be opened')
+            self._configure()
+
+        if not self._is_grabbing:
+            self._is_grabbing = True
+            self._latest.reset()
+            self._grabber = threading.Thread(target=self._grab, daemon=True)
+            self._grabber.start()
 
     def setIdle(self):
 
+        if self._is_grabbing:
+            self._is_grabbing = False
+            self._grabber.join()
+            self._grabber = None
+
         if self._cap.isOpened():
             self._cap.release()
 
-    def getPreview(self):
+        # Never return a frame from before the camera was released
+        self._latest.reset()
 
-        return self.getPicture()
+    def _configure(self):
 
-    def getPicture(self):
+        if len(self._fourcc) == 4:
+            self._cap.set(cv2.CAP_PROP_FOURCC,
+                          cv2.VideoWriter_fourcc(*self._fourcc))
+        if self._requested_size[0] > 0 and self._requested_size[1] > 0:
+            self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, self._requested_size[0])
+            self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self._requested_size[1])
+        if self._buffer_size > 0:
+            self._cap.set(cv2.CAP_PROP_BUFFERSIZE, self._buffer_size)
+
+        logging.info('OpenCV capture size is %dx%d',
+                     self._cap.get(cv2.CAP_PROP_FRAME_WIDTH),
+                     self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    def _grab(self):
+
+        while self._is_grabbing:
+            status, frame = self._cap.read()
+            if not status:
+                self._is_grabbing = False
+                self._latest.fail(RuntimeError('Failed to capture picture'))
+            else:
+                self._latest.put(frame)
+
+    def _getFrame(self):
 
         self.setActive()
-        status, frame = self._cap.read()
-        if not status:
-            raise RuntimeError('Failed to capture picture')
+        return self._latest.get()
+
+    def getCaptureSize(self):
+
+        self.setActive()
+        size = (int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        return size if size[0] > 0 and size[1] > 0 else None
+
+    def setPreviewSize(self, size):
+
+        self._preview_size = tuple(size)
+        return True
+
+    def getPreview(self):
+
+        frame = self._getFrame()
+        if self._preview_size is not None:
+            frame = cv2.resize(frame, self._preview_size,
+                               interpolation=cv2.INTER_AREA)
+
+        # Preview frames are passed on as RGB arrays without PIL
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def getPicture(self):
 
         # OpenCV yields frames in BGR format, conversion to RGB necessary.
         # (See https://stackoverflow.com/a/32270308)
-        return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        return Image.fromarray(cv2.cvtColor(self._getFrame(),
+                                            cv2.COLOR_BGR2RGB))
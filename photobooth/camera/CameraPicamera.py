@@ -19,17 +19,19 @@
 
 import io
 import logging
+import threading
 
 from PIL import Image
 
 from picamera import PiCamera
 
 from .CameraInterface import CameraInterface
+from .LatestFrame import LatestFrame
 
 
 class CameraPicamera(CameraInterface):
 
-    def __init__(self):
+    def __init__(self, config):
 
         super().__init__()
 
@@ -39,36 +41,139 @@ class CameraPicamera(CameraInterface):
         logging.info('Using PiCamera')
 
         self._cap = None
+        self._lock = threading.RLock()
+
+        # Camera stays open for some time after switching to idle
+        self._grace_time = config.getFloat('Camera', 'grace_time')
+        self._idle_timer = None
+        self._idle_count = 0
+
+        # Preview frames are streamed continuously from the video port and
+        # only the newest one is kept
+        self._latest = LatestFrame()
+        self._stream_thread = None
+        self._is_streaming = False
 
         self.setActive()
+        self.modelName = 'PiCamera ' + self._cap.revision
+        self._capture_size = tuple(self._cap.resolution)
         self._preview_resolution = (self._cap.resolution[0] // 2,
                                     self._cap.resolution[1] // 2)
         self.setIdle()
 
+    def cleanup(self):
+
+        self._close()
+
     def setActive(self):
 
-        if self._cap is None or self._cap.closed:
-            self._cap = PiCamera()
+        with self._lock:
+            # A timer that has already fired must not close the camera
+            self._idle_count += 1
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+
+            if self._cap is None or self._cap.closed:
+                self._cap = PiCamera()
 
     def setIdle(self):
 
-        if self._cap is not None and not self._cap.closed:
-            self._cap.close()
+        with self._lock:
+            self._stopStreaming()
+            if self._idle_timer is None and self._cap is not None:
+                self._idle_timer = threading.Timer(self._grace_time,
+                                                   self._closeIdle,
+                                                   (self._idle_count, ))
+                self._idle_timer.daemon = True
+                self._idle_timer.start()
+
+    def _closeIdle(self, count):
+
+        with self._lock:
+            if count == self._idle_count:
+                self._close()
+
+    def _close(self):
+
+        with self._lock:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+
+            self._stopStreaming()
+            if self._cap is not None and not self._cap.closed:
+                logging.debug('Closing PiCamera')
+                self._cap.close()
             self._cap = None
 
-    def getPreview(self):
+    def _startStreaming(self):
+
+        with self._lock:
+            self.setActive()
+            if not self._is_streaming:
+                self._is_streaming = True
+                self._latest.reset()
+                self._stream_thread = threading.Thread(target=self._stream,
+                                                       daemon=True)
+                self._stream_thread.start()
+
+    def _stopStreaming(self):
+
+        with self._lock:
+            if self._is_streaming:
+                self._is_streaming = False
+                self._stream_thread.join()
+                self._stream_thread = None
+                # Never return a frame from before the camera was released
+                self._latest.reset()
+
+    def _stream(self):
 
-        self.setActive()
         stream = io.BytesIO()
-        self._cap.capture(stream, format='jpeg', use_video_port=True,
-                          resize=self._preview_resolution)
-        stream.seek(0)
-        return Image.open(stream)
+        try:
+            for _ in self._cap.capture_continuous(
+                    stream, format='jpeg', use_video_port=True,
+                    resize=self._preview_resolution):
+                self._latest.put(stream.getvalue())
+
+                if not self._is_streaming:
+                    break
+
+                stream.seek(0)
+                stream.truncate()
+        except Exception as e:
+            logging.exception('CameraPicamera: Streaming failed')
+            self._is_streaming = False
+            self._latest.fail(e)
+
+    def setPreviewSize(self, size):
+
+        # Resizing is done by the GPU
+        with self._lock:
+            self._stopStreaming()
+            self._preview_resolution = tuple(size)
+        return True
+
+    def getCaptureSize(self):
+
+        return self._capture_size
+
+    def getPreview(self):
+
+        self._startStreaming()
+        return Image.open(io.BytesIO(self._latest.get()))
 
     def getPicture(self):
 
-        self.setActive()
-        stream = io.BytesIO()
-        self._cap.capture(stream, format='jpeg', resize=None)
-        stream.seek(0)
-        return Image.open(stream)
+        return Image.open(io.BytesIO(self.getPictureBytes()[0]))
+
+    def getPictureBytes(self):
+
+        with self._lock:
+            # Stills are taken from the still port
+            self._stopStreaming()
+            self.setActive()
+            stream = io.BytesIO()
+            self._cap.capture(stream, format='jpeg', resize=None)
+            return stream.getvalue(), 1
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Photobooth - a flexible photo booth software
+# Copyright (C) 2018  Balthasar Reuter <photobooth at re - web dot eu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import configparser
+import json
+import logging
+import os
+
+from functools import lru_cache
+
+
+class Slot:
+    """A rectangle in the assembled picture.
+
+    Shots are cropped to the aspect ratio of the slot, resized to its size
+    and rotated counter-clockwise by rotation degree. Slots with a higher
+    z are pasted on top of those with a lower one.
+    """
+
+    def __init__(self, offset, size, rotation=0, z=0):
+
+        super().__init__()
+
+        self._offset = tuple(offset)
+        self._size = tuple(size)
+        self._rotation = rotation
+        self._z = z
+
+    def __str__(self):
+
+        return 'Slot({}, {}, {}, {})'.format(self._offset, self._size,
+                                             self._rotation, self._z)
+
+    @property
+    def offset(self):
+
+        return self._offset
+
+    @property
+    def size(self):
+
+        return self._size
+
+    @property
+    def rotation(self):
+
+        return self._rotation
+
+    @property
+    def z(self):
+
+        return self._z
+
+    def cropBox(self, picture_size, angle):
+        """Return the centered box of a picture with picture_size that has
+        the aspect ratio of this slot after rotating the picture by angle
+        degree counter-clockwise.
+        """
+
+        size = self._size if angle in (0, 180) else self._size[::-1]
+
+        # Crop along the axis where the picture is relatively larger, unless
+        # this removes less than a pixel of the resized picture
+        width, height = picture_size
+        if width * size[1] > height * size[0]:
+            width = height * size[0] / size[1]
+            if (picture_size[0] - width) * size[1] / height < 1:
+                width = picture_size[0]
+        else:
+            height = width * size[1] / size[0]
+            if (picture_size[1] - height) * size[0] / width < 1:
+                height = picture_size[1]
+
+        left = (picture_size[0] - width) / 2
+        top = (picture_size[1] - height) / 2
+        return (left, top, left + width, top + height)
+
+
+class CollageLayout:
+    """Positions of shots and placeholders in the assembled picture.
+
+    The layout is either the grid computed by PictureDimensions or read from
+    a JSON or INI file. Shots are assigned to slots in the order they are
+    listed. Placeholders mark areas for the picture shown in place of
+    skipped shots.
+    """
+
+    def __init__(self, output_size, slots, placeholders):
+
+        super().__init__()
+
+        self._output_size = tuple(output_size)
+        self._slots = slots
+        self._placeholders = placeholders
+
+        # Paste in z-order, keeping the order of shots for equal z
+        self._paste_order = sorted(range(len(slots)), key=lambda i: slots[i].z)
+
+        logging.debug('Collage layout of size %s with slots %s',
+                      self._output_size, ', '.join(str(s) for s in slots))
+
+    @classmethod
+    def fromDimensions(cls, dimensions):
+
+        slots = [Slot(offset, dimensions.thumbnailSize)
+                 for offset in dimensions.thumbnailOffset]
+        placeholders = [Slot(offset, dimensions.thumbnailSize)
+                        for offset in dimensions.skipOffset]
+        return cls(dimensions.outputSize, slots, placeholders)
+
+    @classmethod
+    def fromFile(cls, filename, default_size):
+
+        description = read_layout(filename, os.stat(filename).st_mtime)
+        output_size = description['size'] or default_size
+        slots = [Slot(**s) for s in description['slots']]
+        placeholders = [Slot(**s) for s in description['placeholders']]
+
+        for slot in slots + placeholders:
+            if (slot.offset[0] + slot.size[0] > output_size[0] or
+               slot.offset[1] + slot.size[1] > output_size[1]):
+                raise ValueError('{} exceeds picture size {}x{}'.format(
+                    slot, *output_size))
+
+        return cls(output_size, slots, placeholders)
+
+    @property
+    def outputSize(self):
+
+        return self._output_size
+
+    @property
+    def slots(self):
+
+        return self._slots
+
+    @property
+    def placeholders(self):
+
+        return self._placeholders
+
+    @property
+    def pasteOrder(self):
+
+        return self._paste_order
+
+    @property
+    def numShots(self):
+
+        return len(self._slots)
+
+
+def _parse_slot(entry, name):
+
+    try:
+        offset = (int(entry['x']), int(entry['y']))
+        size = (int(entry['width']), int(entry['height']))
+        rotation = int(entry.get('rotation', 0))
+        z = int(entry.get('z', 0))
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError('Invalid {} in layout: {}'.format(name, e))
+
+    if offset[0] < 0 or offset[1] < 0:
+        raise ValueError('Negative position of {} in layout'.format(name))
+    if size[0] <= 0 or size[1] <= 0:
+        raise ValueError('Invalid size of {} in layout'.format(name))
+    if rotation not in (0, 90, 180, 270):
+        raise ValueError('Rotation of {} must be 0, 90, 180 or 270'.format(
+            name))
+
+    return {'offset': offset, 'size': size, 'rotation': rotation, 'z': z}
+
+
+def _read_json(filename):
+
+    with open(filename, 'r') as f:
+        description = json.load(f)
+
+    if 'width' in description or 'height' in description:
+        size = (description.get('width'), description.get('height'))
+    else:
+        size = None
+
+    return (size, description.get('slots', []),
+            description.get('placeholders', []))
+
+
+def _read_ini(filename):
+
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(filename)
+
+    size = None
+    if parser.has_section('layout'):
+        size = (parser.get('layout', 'width'), parser.get('layout', 'height'))
+
+    slots = [dict(parser[s]) for s in parser.sections()
+             if s.split()[0] == 'slot']
+    placeholders = [dict(parser[s]) for s in parser.sections()
+                    if s.split()[0] == 'placeholder']
+    return size, slots, placeholders
+
+
+@lru_cache(maxsize=4)
+def read_layout(filename, mtime=None):
+    """Read and validate a layout description from a JSON file or an INI
+    file with sections [layout], [slot ...] and [placeholder ...]. The
+    result is cached per filename and modification time.
+    """
+
+    if os.path.splitext(filename)[1].lower() == '.json':
+        size, slots, placeholders = _read_json(filename)
+    else:
+        size, slots, placeholders = _read_ini(filename)
+
+    if size is not None:
+        try:
+            size = (int(size[0]), int(size[1]))
+        except (TypeError, ValueError):
+            raise ValueError('Invalid picture size in layout')
+
+    if len(slots) == 0:
+        raise ValueError('Layout "{}" contains no slots'.format(filename))
+
+    return {'size': size,
+            'slots': [_parse_slot(s, 'slot {}'.format(i + 1))
+                      for i, s in enumerate(slots)],
+            'placeholders': [_parse_slot(p, 'placeholder {}'.format(i + 1))
+                             for i, p in enumerate(placeholders)]}
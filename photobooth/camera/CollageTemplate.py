@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Photobooth - a flexible photo booth software
+# Copyright (C) 2018  Balthasar Reuter <photobooth at re - web dot eu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import json
+import logging
+import os
+
+from PIL import Image
+
+from ..util import cache_dir
+
+
+class CollageTemplate:
+    """Background and overlay of the assembled picture.
+
+    The background (with transparency composited onto white) and pictures
+    for placeholders of skipped shots, e.g., a logo, are rendered into a
+    single canvas. An optional overlay, e.g., a frame, is pasted on top of
+    the shots using its alpha channel as mask. If there are any such
+    pictures, both are stored as raw pixels in the cache, keyed by a hash of
+    all inputs, and only rebuilt when these change. The cache is best
+    effort, if it is not accessible the template is built in memory.
+    """
+
+    _version = 1
+
+    def __init__(self, config, layout):
+
+        super().__init__()
+
+        self._size = layout.outputSize
+        self._placeholders = [(p.offset, p.size)
+                              for p in layout.placeholders]
+
+        self._background = config.get('Picture', 'background')
+        self._skip_image = config.get('Picture', 'skip_image')
+        self._overlay_image = config.get('Picture', 'overlay')
+
+        self._key = self._computeKey()
+        self._path = self._cachePath()
+
+        self._canvas = None
+        self._overlay = None
+        self.load()
+
+    @property
+    def canvas(self):
+
+        return self._canvas
+
+    @property
+    def _hasPictures(self):
+
+        return (len(self._background) > 0 or len(self._overlay_image) > 0 or
+                (len(self._skip_image) > 0 and len(self._placeholders) > 0))
+
+    def _cachePath(self):
+
+        # A plain white canvas is faster to create than to read
+        if not self._hasPictures:
+            return None
+
+        try:
+            path = os.path.join(cache_dir(), 'templates')
+            os.makedirs(path, exist_ok=True)
+        except OSError as e:
+            logging.warn('Cannot cache collage template: %s', e)
+            return None
+
+        return path
+
+    def _fileInfo(self, filename):
+
+        if len(filename) == 0:
+            return None
+        stat = os.stat(filename)
+        return (os.path.abspath(filename), stat.st_mtime, stat.st_size)
+
+    def _computeKey(self):
+
+        inputs = {'version': self._version,
+                  'size': self._size,
+                  'placeholders': self._placeholders,
+                  'background': self._fileInfo(self._background),
+                  'skip_image': self._fileInfo(self._skip_image),
+                  'overlay': self._fileInfo(self._overlay_image)}
+        data = json.dumps(inputs, sort_keys=True).encode('utf-8')
+        return hashlib.sha1(data).hexdigest()
+
+    def _filename(self, suffix):
+
+        return os.path.join(self._path, self._key + suffix)
+
+    def load(self):
+
+        has_overlay = len(self._overlay_image) > 0
+        if self._path is not None and self._readCache(has_overlay):
+            logging.info('Using cached collage template %s', self._key)
+            return
+
+        logging.debug('Building collage template %s', self._key)
+        self._canvas = self._buildCanvas()
+        if has_overlay:
+            self._overlay = self._buildOverlay()
+
+        if self._path is not None:
+            self._writeCache(has_overlay)
+
+    def _readCache(self, has_overlay):
+
+        canvas_file = self._filename('.rgb')
+        overlay_file = self._filename('.rgba')
+        if (not os.path.exists(canvas_file) or
+           (has_overlay and not os.path.exists(overlay_file))):
+            return False
+
+        try:
+            self._canvas = self._readRaw(canvas_file, 'RGB')
+            if has_overlay:
+                self._overlay = self._readRaw(overlay_file, 'RGBA')
+        except (OSError, ValueError) as e:
+            logging.warn('Cannot read cached collage template: %s', e)
+            return False
+
+        return True
+
+    def _writeCache(self, has_overlay):
+
+        try:
+            self._writeRaw(self._filename('.rgb'), self._canvas)
+            if has_overlay:
+                self._writeRaw(self._filename('.rgba'), self._overlay)
+            self._prune()
+        except OSError as e:
+            logging.warn('Cannot cache collage template: %s', e)
+
+    def _readRaw(self, filename, mode):
+
+        with open(filename, 'rb') as f:
+            return Image.frombytes(mode, self._size, f.read())
+
+    def _writeRaw(self, filename, image):
+
+        # Write atomically to never leave a truncated template behind
+        tmp_file = filename + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(image.tobytes())
+        os.replace(tmp_file, filename)
+
+    def _prune(self):
+
+        for filename in os.listdir(self._path):
+            if not filename.startswith(self._key):
+                os.remove(os.path.join(self._path, filename))
+
+    def _buildCanvas(self):
+
+        if not self._hasPictures:
+            return Image.new('RGB', self._size, (255, 255, 255))
+
+        canvas = Image.new('RGBA', self._size, (255, 255, 255, 255))
+
+        if len(self._background) > 0:
+            logging.info('Using background "{}"'.format(self._background))
+            background = Image.open(self._background).convert('RGBA')
+            background = background.resize(self._size, Image.LANCZOS)
+            canvas = Image.alpha_composite(canvas, background)
+
+        if len(self._skip_image) > 0 and len(self._placeholders) > 0:
+            logging.info('Using "{}" for skipped pictures'.format(
+                self._skip_image))
+            skip_image = Image.open(self._skip_image).convert('RGBA')
+            for offset, size in self._placeholders:
+                picture = skip_image.copy()
+                picture.thumbnail(size, Image.LANCZOS)
+                margin = tuple((size[i] - picture.size[i]) // 2
+                               for i in range(2))
+                canvas.paste(picture, tuple(offset[i] + margin[i]
+                                            for i in range(2)), picture)
+
+        return canvas.convert('RGB')
+
+    def _buildOverlay(self):
+
+        logging.info('Using overlay "{}"'.format(self._overlay_image))
+        overlay = Image.open(self._overlay_image).convert('RGBA')
+        return overlay.resize(self._size, Image.LANCZOS)
+
+    def applyOverlay(self, collage):
+        """Paste the overlay, if any, on top of the assembled collage"""
+
+        if self._overlay is not None:
+            collage.paste(self._overlay, (0, 0), self._overlay)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Photobooth - a flexible photo booth software
+# Copyright (C) 2018  Balthasar Reuter <photobooth at re - web dot eu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+
+
+class LatestFrame:
+    """Hands the newest frame of a streaming thread over to its consumer.
+
+    The streaming thread publishes frames via put(), each replacing the
+    previous one, or an error via fail(). get() returns the newest frame and
+    waits only if it has been returned before, or raises the error. reset()
+    discards both, so that no frame from before a restart of the stream is
+    returned.
+    """
+
+    def __init__(self):
+
+        super().__init__()
+
+        self._cond = threading.Condition()
+        self._frame = None
+        self._error = None
+        self._seq = 0
+        self._last_seq = 0
+
+    def put(self, frame):
+
+        with self._cond:
+            self._frame = frame
+            self._seq += 1
+            self._cond.notify_all()
+
+    def fail(self, error):
+
+        with self._cond:
+            self._error = error
+            self._cond.notify_all()
+
+    def reset(self):
+
+        with self._cond:
+            self._frame = None
+            self._error = None
+            self._last_seq = self._seq
+
+    def get(self):
+
+        with self._cond:
+            while self._seq == self._last_seq and self._error is None:
+                self._cond.wait()
+
+            if self._error is not None:
+                raise self._error
+
+            self._last_seq = self._seq
+            return self._frame
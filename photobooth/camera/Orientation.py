@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Photobooth - a flexible photo booth software
+# Copyright (C) 2018  Balthasar Reuter <photobooth at re - web dot eu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import shutil
+import struct
+import subprocess
+
+from PIL import Image
+
+# EXIF orientations without mirroring and the counter-clockwise rotation
+# (in degree) that has to be applied to the stored pixels for display
+orientation_angles = {1: 0, 8: 90, 3: 180, 6: 270}
+
+angle_transposes = {0: None, 90: Image.ROTATE_90, 180: Image.ROTATE_180,
+                    270: Image.ROTATE_270}
+
+_orientation_tag = 0x0112
+
+
+def rotate_orientation(orientation, angle):
+    """Return the EXIF orientation that additionally rotates by angle degree
+    counter-clockwise, or None for mirrored orientations.
+    """
+
+    if orientation not in orientation_angles:
+        return None
+
+    total = (orientation_angles[orientation] + angle) % 360
+    return next(o for o, a in orientation_angles.items() if a == total)
+
+
+def orientation_transpose(orientation):
+    """Return the transpose method that displays pixels stored with the
+    given EXIF orientation upright.
+    """
+
+    return angle_transposes[orientation_angles[orientation]]
+
+
+def _exif_segment(orientation):
+
+    ifd = struct.pack('>HHHIHH', 1, _orientation_tag, 3, 1, orientation, 0)
+    tiff = b'MM\x00\x2a' + struct.pack('>I', 8) + ifd + struct.pack('>I', 0)
+    payload = b'Exif\x00\x00' + tiff
+    return b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+
+
+def _patch_exif(data, start, orientation):
+
+    tiff = start + 6
+    order = {b'II': '<', b'MM': '>'}.get(bytes(data[tiff:tiff + 2]))
+    if order is None:
+        return False
+
+    ifd = tiff + struct.unpack_from(order + 'I', data, tiff + 4)[0]
+    count = struct.unpack_from(order + 'H', data, ifd)[0]
+    for i in range(count):
+        entry = ifd + 2 + 12 * i
+        tag, typ = struct.unpack_from(order + 'HH', data, entry)
+        if tag == _orientation_tag and typ == 3:
+            struct.pack_into(order + 'H', data, entry + 8, orientation)
+            return True
+
+    return False
+
+
+def _rewrite_exif(payload, orientation):
+
+    # Adding a tag shifts all offsets behind IFD0, let PIL serialize it
+    exif = Image.Exif()
+    try:
+        exif.load(bytes(payload))
+        exif[_orientation_tag] = orientation
+        payload = exif.tobytes()
+    except (SyntaxError, ValueError, TypeError, KeyError, struct.error) as e:
+        logging.debug('Cannot rewrite EXIF data: {}'.format(e))
+        return None
+
+    if len(payload) + 2 > 0xffff:
+        return None
+
+    return b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+
+
+def set_orientation(data, orientation):
+    """Set the EXIF orientation of JPEG data without re-encoding it.
+
+    An existing orientation tag is patched in place, an EXIF segment without
+    it is rewritten with the tag added and a minimal EXIF segment is
+    inserted if there is none yet. Returns the new data or None if the tag
+    cannot be set this way.
+    """
+
+    data = bytearray(data)
+    if data[:2] != b'\xff\xd8':
+        return None
+
+    insert_at = 2
+    pos = 2
+    try:
+        while pos + 4 <= len(data) and data[pos] == 0xff:
+            marker = data[pos + 1]
+            if marker == 0xda:
+                # Start of scan, no more metadata
+                break
+
+            length = struct.unpack_from('>H', data, pos + 2)[0]
+            if marker == 0xe1 and data[pos + 4:pos + 10] == b'Exif\x00\x00':
+                if _patch_exif(data, pos + 4, orientation):
+                    return bytes(data)
+                elif orientation == 1:
+                    # A missing tag means normal orientation
+                    return bytes(data)
+
+                segment = _rewrite_exif(data[pos + 4:pos + 2 + length],
+                                        orientation)
+                if segment is None:
+                    return None
+                return bytes(data[:pos] + segment + data[pos + 2 + length:])
+            elif marker == 0xe0:
+                # Keep JFIF header in front
+                insert_at = pos + 2 + length
+
+            pos += 2 + length
+    except struct.error:
+        return None
+
+    if orientation == 1:
+        return bytes(data)
+
+    return bytes(data[:insert_at] + _exif_segment(orientation) +
+                 data[insert_at:])
+
+
+def rotate_lossless(data, angle):
+    """Rotate JPEG data by angle degree counter-clockwise in the DCT domain
+    using jpegtran. Partial blocks at the edges are trimmed. Returns the
+    rotated data with orientation reset to normal or None if jpegtran is
+    not available or failed.
+    """
+
+    jpegtran = shutil.which('jpegtran')
+    if jpegtran is None:
+        return None
+
+    # jpegtran rotates clockwise
+    cmd = [jpegtran, '-copy', 'all', '-trim', '-rotate',
+           str((360 - angle) % 360)]
+    try:
+        rotated = subprocess.run(cmd, input=data, stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE, check=True).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        logging.warn('Lossless rotation failed: {}'.format(e))
+        return None
+
+    # Copied EXIF data must not rotate the picture a second time
+    return set_orientation(rotated, 1)
@@ -74,13 +74,13 @@ class PictureDimensions:
         thumbs = [i for i in range(self.numPictures[0] * self.numPictures[1])
                   if i + 1 not in self._skip]
 
-        self._thumb_offsets = []
-        for i in thumbs:
+        def offset(i):
             pos = (i % self.numPictures[0], i // self.numPictures[0])
-            self._thumb_offsets.append(tuple(border[j] +
-                                             (pos[j] + 1) * thumb_dist[j] +
-                                             pos[j] * self.thumbnailSize[j]
-                                             for j in range(2)))
+            return tuple(border[j] + (pos[j] + 1) * thumb_dist[j] +
+                         pos[j] * self.thumbnailSize[j] for j in range(2))
+
+        self._thumb_offsets = [offset(i) for i in thumbs]
+        self._skip_offsets = [offset(i - 1) for i in self._skip]
 
         logging.debug(('Assembled picture will contain {} ({}x{}) pictures '
                        'in positions {}').format(self.totalNumPictures,
@@ -144,6 +144,11 @@ class PictureDimensions:
 
         return self._thumb_offsets
 
+    @property
+    def skipOffset(self):
+
+        return self._skip_offsets
+
     @property
     def previewSize(self):
 
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Photobooth - a flexible photo booth software
+# Copyright (C) 2018  Balthasar Reuter <photobooth at re - web dot eu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import time
+
+
+class PreviewController:
+    """Paces preview frames and adapts their quality to a latency budget.
+
+    The latency from acquiring a frame to painting it in the Gui is fed back
+    via update(). While it exceeds the budget, the JPEG quality, then the
+    resolution and finally the frame rate are lowered step by step. They are
+    raised again in reverse order while the latency stays well below it.
+    """
+
+    quality_factors = (1.0, 0.8, 0.65)
+    scales = (1.0, 0.75, 0.5)
+    rates = (1.0, 0.75, 0.5)
+
+    def __init__(self, target_fps, latency_budget, is_jpeg=True,
+                 quality=85, hold_time=1.0):
+
+        super().__init__()
+
+        self._target_fps = target_fps
+        self._budget = latency_budget
+        self._hold_time = hold_time
+
+        # Settings from best to cheapest, JPEG quality does not matter for
+        # frames passed as raw pixels
+        qualities = [int(quality * q) for q in self.quality_factors]
+        if not is_jpeg:
+            qualities = qualities[:1]
+        self._levels = ([(q, self.scales[0], self.rates[0])
+                         for q in qualities] +
+                        [(qualities[-1], s, self.rates[0])
+                         for s in self.scales[1:]] +
+                        [(qualities[-1], self.scales[-1], r)
+                         for r in self.rates[1:]])
+        self._level = 0
+
+        self._latency = 0.0
+        self.start()
+
+    def start(self):
+        """Reset pacing and frame counting, e.g., for a new countdown"""
+
+        now = time.monotonic()
+        self._start = now
+        self._deadline = now
+        self._changed = now
+        self._frames = 0
+
+    @property
+    def quality(self):
+
+        return self._levels[self._level][0]
+
+    @property
+    def scale(self):
+
+        return self._levels[self._level][1]
+
+    @property
+    def fps(self):
+
+        return self._target_fps * self._levels[self._level][2]
+
+    @property
+    def achievedFps(self):
+
+        elapsed = time.monotonic() - self._start
+        return self._frames / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def metrics(self):
+
+        return {'preview_fps_target': self.fps,
+                'preview_fps_achieved': self.achievedFps,
+                'preview_latency': self._latency,
+                'preview_scale': self.scale,
+                'preview_quality': self.quality}
+
+    def wait(self):
+        """Block until the next frame is due"""
+
+        now = time.monotonic()
+        if self._deadline > now:
+            time.sleep(self._deadline - now)
+            now = self._deadline
+
+        # Do not catch up on missed frames in a burst
+        self._deadline = max(self._deadline + 1 / self.fps, now)
+
+    def update(self, latency):
+        """Count a sent frame and adapt settings to the given latency in
+        seconds
+        """
+
+        self._frames += 1
+        self._latency = latency
+
+        now = time.monotonic()
+        if latency <= 0 or now - self._changed < self._hold_time:
+            return
+
+        if latency > self._budget and self._level < len(self._levels) - 1:
+            self._level += 1
+        elif latency < self._budget / 2 and self._level > 0:
+            self._level -= 1
+        else:
+            return
+
+        self._changed = now
+        logging.debug('Preview latency %d ms, switching to %.1f fps, scale '
+                      '%.2f, quality %d', latency * 1000, self.fps,
+                      self.scale, self.quality)
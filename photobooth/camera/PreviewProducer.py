@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Photobooth - a flexible photo booth software
+# Copyright (C) 2018  Balthasar Reuter <photobooth at re - web dot eu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import queue
+import threading
+import time
+
+
+class PreviewProducer(threading.Thread):
+    """Acquires preview frames in a background thread.
+
+    Frames are handed over through a bounded queue, so that fetching the
+    next frame from the camera overlaps with processing the current one.
+    If given, pace is called before each acquisition to limit the frame rate.
+    The camera must not be used by anyone else until stop() returned.
+    """
+
+    def __init__(self, get_preview, depth=2, pace=None):
+
+        super().__init__(daemon=True)
+
+        self._get_preview = get_preview
+        self._pace = pace
+        self._queue = queue.Queue(maxsize=depth)
+        self._halt = threading.Event()
+        self._error = None
+
+    def run(self):
+
+        try:
+            while not self._halt.is_set():
+                if self._pace is not None:
+                    self._pace()
+                picture = self._get_preview()
+                # Monotonic time is comparable across processes and is used
+                # to measure the latency until the frame is displayed
+                timestamp = time.monotonic()
+                while not self._halt.is_set():
+                    try:
+                        self._queue.put((picture, timestamp), timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+        except Exception as e:
+            logging.exception('PreviewProducer: Exception "{}"'.format(e))
+            self._error = e
+
+    def get(self, timeout=0.1):
+        """Return the next preview frame and its acquisition time or
+        (None, None) if none arrived within timeout. Errors of the producer
+        thread are re-raised here.
+        """
+
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            if self._error is not None:
+                raise self._error
+            return None, None
+
+    def stop(self):
+        """Stop acquisition and wait until the camera is released"""
+
+        self._halt.set()
+        while self.is_alive():
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.join(0.1)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Photobooth - a flexible photo booth software
+# Copyright (C) 2018  Balthasar Reuter <photobooth at re - web dot eu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from PIL import Image
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _multiply(a, b):
+
+    return tuple(tuple(sum(a[i][k] * b[k][j] for k in range(3))
+                       for j in range(3)) for i in range(3))
+
+
+class PreviewTransform:
+    """Resizes, rotates and mirrors preview frames in a single pass.
+
+    The affine transformation that maps the preview back onto the camera
+    frame is computed once per frame size and then applied with a single
+    call to Image.transform. Frames given as NumPy arrays are sampled with
+    precomputed index maps instead. Frames that already have the requested
+    size are only flipped.
+    """
+
+    # Transpose methods that rotate counter-clockwise and mirror at once
+    _flips = {0: Image.FLIP_LEFT_RIGHT, 90: Image.TRANSVERSE,
+              180: Image.FLIP_TOP_BOTTOM, 270: Image.TRANSPOSE}
+
+    def __init__(self, preview_size, angle, resample=Image.BILINEAR):
+
+        super().__init__()
+
+        self._size = preview_size
+        self._angle = angle
+        self._resample = resample
+        self._affine = {}
+        self._index_maps = {}
+
+    @property
+    def unrotatedSize(self):
+
+        if self._angle in (90, 270):
+            return self._size[::-1]
+        else:
+            return self._size
+
+    def _computeAffine(self, frame_size):
+
+        width, height = self._size
+        un_width, un_height = self.unrotatedSize
+
+        # Undo mirroring
+        mirror = ((-1, 0, width), (0, 1, 0), (0, 0, 1))
+
+        # Undo counter-clockwise rotation
+        rotation = {0: ((1, 0, 0), (0, 1, 0), (0, 0, 1)),
+                    90: ((0, -1, un_width), (1, 0, 0), (0, 0, 1)),
+                    180: ((-1, 0, un_width), (0, -1, un_height), (0, 0, 1)),
+                    270: ((0, 1, 0), (-1, 0, un_height), (0, 0, 1))}
+
+        # Undo resizing
+        scale = ((frame_size[0] / un_width, 0, 0),
+                 (0, frame_size[1] / un_height, 0), (0, 0, 1))
+
+        matrix = _multiply(scale, _multiply(rotation[self._angle], mirror))
+        return matrix[0] + matrix[1]
+
+    def _computeIndexMap(self, frame_size):
+
+        a, b, c, d, e, f = self._computeAffine(frame_size)
+        x, y = numpy.meshgrid(numpy.arange(self._size[0]) + 0.5,
+                              numpy.arange(self._size[1]) + 0.5)
+        cols = numpy.clip(numpy.floor(a * x + b * y + c), 0, frame_size[0] - 1)
+        rows = numpy.clip(numpy.floor(d * x + e * y + f), 0, frame_size[1] - 1)
+        return rows.astype(numpy.intp), cols.astype(numpy.intp)
+
+    def _transformArray(self, frame):
+
+        frame_size = (frame.shape[1], frame.shape[0])
+        if frame_size not in self._index_maps:
+            self._index_maps[frame_size] = self._computeIndexMap(frame_size)
+
+        rows, cols = self._index_maps[frame_size]
+        return frame[rows, cols]
+
+    def __call__(self, picture):
+
+        if numpy is not None and isinstance(picture, numpy.ndarray):
+            return self._transformArray(picture)
+
+        if picture.size == self.unrotatedSize:
+            return picture.transpose(self._flips[self._angle])
+
+        # Sampling aliases for large factors, thus shrink by an
+        # integer factor first (cheap box filter)
+        factor = int(min(picture.size[i] / self.unrotatedSize[i]
+                         for i in range(2)))
+        if factor >= 2 and hasattr(picture, 'reduce'):
+            picture = picture.reduce(factor)
+
+        if picture.size not in self._affine:
+            self._affine[picture.size] = self._computeAffine(picture.size)
+
+        return picture.transform(self._size, Image.AFFINE,
+                                 self._affine[picture.size], self._resample)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Photobooth - a flexible photo booth software
+# Copyright (C) 2018  Balthasar Reuter <photobooth at re - web dot eu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from PIL import Image
+
+
+class QualityPreset:
+    """Resampling filters and JPEG encoder parameters trading quality for
+    speed.
+
+    Encoder parameters are kept separately for the assembled picture, kept
+    shots that have to be re-encoded and preview frames, and are passed as
+    keyword arguments to Image.save.
+    """
+
+    def __init__(self, name, resample, use_reduce, preview_resample,
+                 output_params, shot_params, preview_params):
+
+        super().__init__()
+
+        self._name = name
+        self._resample = resample
+        self._use_reduce = use_reduce
+        self._preview_resample = preview_resample
+        self._output_params = output_params
+        self._shot_params = shot_params
+        self._preview_params = preview_params
+
+    def __str__(self):
+
+        return self._name
+
+    @property
+    def resample(self):
+
+        return self._resample
+
+    @property
+    def previewResample(self):
+
+        return self._preview_resample
+
+    @property
+    def outputParams(self):
+
+        return self._output_params
+
+    @property
+    def shotParams(self):
+
+        return self._shot_params
+
+    @property
+    def previewParams(self):
+
+        return self._preview_params
+
+    def resize(self, picture, size, box=None):
+        """Resize the region box (default: all) of picture to size using the
+        filter of this preset
+        """
+
+        if box is None:
+            box = (0, 0) + picture.size
+
+        # Shrinking by an integer factor first is cheap and lets the
+        # subsequent filter work on a much smaller picture
+        if self._use_reduce and hasattr(picture, 'reduce'):
+            factor = int(min((box[i + 2] - box[i]) / size[i]
+                             for i in range(2)))
+            if factor >= 2:
+                int_box = tuple(int(round(b)) for b in box)
+                picture = picture.reduce(factor, int_box)
+                box = (0, 0) + picture.size
+
+        return picture.resize(size, self._resample, box)
+
+
+# Available presets, JPEG subsampling 0 is 4:4:4, 1 is 4:2:2, 2 is 4:2:0
+presets = {
+    'fast': QualityPreset(
+        'fast', Image.NEAREST, False, Image.NEAREST,
+        {'quality': 80, 'subsampling': 2},
+        {'quality': 85, 'subsampling': 2},
+        {'quality': 70, 'subsampling': 2}),
+    'balanced': QualityPreset(
+        'balanced', Image.BILINEAR, True, Image.BILINEAR,
+        {'quality': 90, 'subsampling': 1, 'optimize': True},
+        {'quality': 90, 'subsampling': 1},
+        {'quality': 80, 'subsampling': 2}),
+    'best': QualityPreset(
+        'best', Image.LANCZOS, False, Image.BICUBIC,
+        {'quality': 95, 'subsampling': 0, 'optimize': True,
+         'progressive': True},
+        {'quality': 95, 'subsampling': 0, 'optimize': True},
+        {'quality': 85, 'subsampling': 1})}
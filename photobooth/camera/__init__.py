@@ -17,14 +17,28 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+import configparser
 import logging
+import os
+import time
 
-from PIL import Image, ImageOps
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
 from io import BytesIO
 
+from .CollageLayout import CollageLayout
+from .CollageTemplate import CollageTemplate
+from .Orientation import (angle_transposes, orientation_angles,
+                          orientation_transpose, rotate_lossless,
+                          rotate_orientation, set_orientation)
 from .PictureDimensions import PictureDimensions
+from .PreviewController import PreviewController
+from .PreviewProducer import PreviewProducer
+from .PreviewTransform import PreviewTransform
+from .QualityPreset import presets
 from .. import StateMachine
 from ..Threading import Workers
+from ..util import cache_dir, draft_image
 
 # Available camera modules as tuples of (config name, module name, class name)
 modules = (
@@ -36,9 +50,21 @@ modules = (
     ('picamera', 'CameraPicamera', 'CameraPicamera'),
     ('dummy', 'CameraDummy', 'CameraDummy'))
 
+# Available capture modes
+capture_modes = ('single', 'burst', 'boomerang')
+
+# Formats PIL can save as animation
+animation_formats = ('gif', 'webp', 'png')
+
 
 class Camera:
 
+    # States that are handled or end the preview loop
+    subscriptions = (StateMachine.StartupState, StateMachine.GreeterState,
+                     StateMachine.CountdownState, StateMachine.CaptureState,
+                     StateMachine.AssembleState, StateMachine.ErrorState,
+                     StateMachine.TeardownState)
+
     def __init__(self, config, comm, CameraModule):
 
         super().__init__()
@@ -50,41 +76,141 @@ class Camera:
         self._cap = None
         self._pic_dims = None
 
+        self._assembler = None
+        self._resizer = None
+        self._layout = None
+        self._collage = None
+        self._collage_tasks = []
+        self._thumbnails = {}
+        self._num_pasted = 0
+        self._animation = []
+
+        self._capture_mode = self._cfg.get('Picture', 'capture_mode')
+        if self._capture_mode not in capture_modes:
+            raise ValueError('Unknown capture mode "{}"'.format(
+                self._capture_mode))
+        self._burst_frames = self._cfg.getInt('Picture', 'burst_frames')
+        self._burst_interval = self._cfg.getInt('Picture', 'burst_interval')
+        self._burst_size = self._cfg.getInt('Picture', 'burst_size')
+        self._is_burst_preview = (self._cfg.get('Picture', 'burst_source') ==
+                                  'preview')
+        self._animation_format = self._cfg.get('Picture', 'animation_format')
+        if self._animation_format not in animation_formats:
+            raise ValueError('Unknown animation format "{}"'.format(
+                self._animation_format))
+
+        preset = self._cfg.get('Picture', 'preset')
+        if preset not in presets:
+            raise ValueError('Unknown preset "{}"'.format(preset))
+        self._preset = presets[preset]
+
         self._is_preview = self._cfg.getBool('Photobooth', 'show_preview')
+        self._preview_control = PreviewController(
+            self._cfg.getFloat('Photobooth', 'preview_fps'),
+            self._cfg.getInt('Photobooth', 'preview_latency') / 1000,
+            self._comm.frameRing is None,
+            self._preset.previewParams['quality'])
         self._is_keep_pictures = self._cfg.getBool('Storage', 'keep_pictures')
 
-        rot_vals = {0: None, 90: Image.ROTATE_90, 180: Image.ROTATE_180,
-                    270: Image.ROTATE_270}
-        self._rotation = rot_vals[self._cfg.getInt('Camera', 'rotation')]
+        self._angle = self._cfg.getInt('Camera', 'rotation')
+        self._rotation = angle_transposes[self._angle]
+        self._is_lossless_rotation = self._cfg.getBool('Camera',
+                                                       'lossless_rotation')
 
     def startup(self):
 
-        self._cap = self._cam()
+        self._cap = self._cam(self._cfg)
+
+        # Shots are added to the collage in the background during the next
+        # countdown. A single thread guarantees the order of these steps.
+        self._assembler = ThreadPoolExecutor(max_workers=1)
+
+        # Shots are decoded and downscaled in parallel as PIL releases the
+        # GIL while doing so. Only pasting them is left to the assembler.
+        self._resizer = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
 
         logging.info('Using camera {} preview functionality'.format(
             'with' if self._is_preview else 'without'))
 
-        test_picture = self._cap.getPicture()
-        if self._rotation is not None:
-            test_picture = test_picture.transpose(self._rotation)
+        capture_size = self._getCaptureSize()
+        if self._angle in (90, 270):
+            capture_size = capture_size[::-1]
 
-        self._pic_dims = PictureDimensions(self._cfg, test_picture.size)
+        self._pic_dims = PictureDimensions(self._cfg, capture_size)
         self._is_preview = self._is_preview and self._cap.hasPreview
 
-        background = self._cfg.get('Picture', 'background')
-        if len(background) > 0:
-            logging.info('Using background "{}"'.format(background))
-            bg_picture = Image.open(background)
-            self._template = bg_picture.resize(self._pic_dims.outputSize)
+        self._preview_transform = PreviewTransform(
+            self._pic_dims.previewSize, self._angle,
+            self._preset.previewResample)
+        self._preview_transforms = {1.0: self._preview_transform}
+
+        # Let the camera scale previews if it can, otherwise this is done
+        # by the preview transform
+        if self._is_preview:
+            is_native = self._cap.setPreviewSize(
+                self._preview_transform.unrotatedSize)
+            logging.info('Preview frames are resized {}'.format(
+                'by the camera' if is_native else 'in software'))
+
+        layout = self._cfg.get('Picture', 'layout')
+        if len(layout) > 0:
+            logging.info('Using layout "{}"'.format(layout))
+            self._layout = CollageLayout.fromFile(layout,
+                                                  self._pic_dims.outputSize)
         else:
-            self._template = Image.new('RGB', self._pic_dims.outputSize,
-                                       (255, 255, 255))
+            self._layout = CollageLayout.fromDimensions(self._pic_dims)
+
+        self._template = CollageTemplate(self._cfg, self._layout)
 
         self.setIdle()
         self._comm.send(Workers.MASTER, StateMachine.CameraEvent('ready'))
 
+    def _getCaptureSize(self):
+
+        model = self._cap.modelName
+        cache = configparser.ConfigParser(interpolation=None)
+        try:
+            filename = os.path.join(cache_dir(), 'capture_size.cfg')
+        except OSError as e:
+            logging.warn('Cannot access cache directory: %s', e)
+            filename = None
+        else:
+            cache.read(filename)
+
+        # Avoid taking a test picture whenever possible
+        size = self._cap.getCaptureSize()
+        if size is not None:
+            logging.info('Camera reports capture size %dx%d', *size)
+        elif cache.has_option(model, 'size'):
+            size = tuple(int(i) for i in cache.get(model, 'size').split('x'))
+            logging.info('Using cached capture size %dx%d', *size)
+        else:
+            logging.info('Taking test picture to determine capture size')
+            size = self._cap.getPicture().size
+
+        value = '{}x{}'.format(*size)
+        if (filename is not None and
+           cache.get(model, 'size', fallback=None) != value):
+            if not cache.has_section(model):
+                cache.add_section(model)
+            cache.set(model, 'size', value)
+            # The cache is best effort, the size is still used if it fails
+            try:
+                with open(filename, 'w') as f:
+                    cache.write(f)
+            except OSError as e:
+                logging.warn('Cannot cache capture size: %s', e)
+
+        return size
+
     def teardown(self, state):
 
+        if self._assembler is not None:
+            self._assembler.shutdown()
+
+        if self._resizer is not None:
+            self._resizer.shutdown()
+
         if self._cap is not None:
             self._cap.cleanup()
 
@@ -112,66 +238,291 @@ class Camera:
 
     def setActive(self):
 
-        self._cap.setActive()
+        with self._comm.metrics.time('camera_operation_seconds',
+                                     operation='setActive'):
+            self._cap.setActive()
 
     def setIdle(self):
 
         if self._cap.hasIdle:
-            self._cap.setIdle()
+            with self._comm.metrics.time('camera_operation_seconds',
+                                         operation='setIdle'):
+                self._cap.setIdle()
+
+    def _getPreview(self):
+
+        with self._comm.metrics.time('camera_operation_seconds',
+                                     operation='getPreview'):
+            return self._cap.getPreview()
+
+    def _getPictureBytes(self):
+
+        with self._comm.metrics.time('camera_operation_seconds',
+                                     operation='getPicture'):
+            return self._cap.getPictureBytes()
 
     def prepareCapture(self):
 
         self.setActive()
-        self._pictures = []
+        self._collage_tasks = [self._assembler.submit(self._startCollage)]
 
     def capturePreview(self):
 
         if self._is_preview:
-            while self._comm.empty(Workers.CAMERA):
-                picture = self._cap.getPreview()
-                if self._rotation is not None:
-                    picture = picture.transpose(self._rotation)
-                picture = picture.resize(self._pic_dims.previewSize)
-                picture = ImageOps.mirror(picture)
-                byte_data = BytesIO()
-                picture.save(byte_data, format='jpeg')
-                self._comm.send(Workers.GUI,
-                                StateMachine.CameraEvent('preview', byte_data))
+            # Frames are fetched from the camera in a separate thread while
+            # the previous one is transformed and sent here
+            control = self._preview_control
+            control.start()
+            producer = PreviewProducer(self._getPreview, pace=control.wait)
+            producer.start()
+
+            try:
+                while self._comm.empty(Workers.CAMERA):
+                    picture, timestamp = producer.get()
+                    if picture is None:
+                        continue
+                    transform = self._previewTransform(control.scale)
+                    if isinstance(picture, Image.Image):
+                        picture = draft_image(picture, transform.unrotatedSize)
+                    self.sendPreview(transform(picture), timestamp)
+                    control.update(self._comm.previewLatency)
+            finally:
+                # Release the camera before the next state is handled, e.g.,
+                # to take a picture in CaptureState
+                producer.stop()
+
+            logging.debug('Preview frames sent: %d, dropped: %d',
+                          *self._comm.latestStats(Workers.GUI, 'preview'))
+            logging.debug('Preview metrics: %s', ', '.join(
+                '{}={:.2f}'.format(*m)
+                for m in sorted(control.metrics.items())))
+            for name, value in control.metrics.items():
+                self._comm.metrics.gauge(name, value)
+
+    def _previewTransform(self, scale):
+
+        if scale not in self._preview_transforms:
+            size = tuple(max(int(s * scale), 1)
+                         for s in self._pic_dims.previewSize)
+            self._preview_transforms[scale] = PreviewTransform(
+                size, self._angle, self._preset.previewResample)
+        return self._preview_transforms[scale]
+
+    def sendPreview(self, picture, timestamp=None):
+
+        ring = self._comm.frameRing
+        if ring is not None:
+            # Hand over raw pixels via shared memory, drop the frame if the
+            # Gui still holds all buffers
+            frame = ring.put(picture)
+            if frame is None:
+                return
+        else:
+            if not isinstance(picture, Image.Image):
+                picture = Image.fromarray(picture)
+            frame = BytesIO()
+            params = dict(self._preset.previewParams,
+                          quality=self._preview_control.quality)
+            picture.save(frame, format='jpeg', **params)
+
+        # The Gui skips frames superseded while it was busy
+        self._comm.sendLatest(
+            Workers.GUI, 'preview',
+            StateMachine.CameraEvent('preview', frame, timestamp))
 
     def capturePicture(self, state):
 
+        if self._capture_mode != 'single':
+            self.captureBurst()
+            self._comm.send(Workers.MASTER,
+                            StateMachine.CameraEvent('assemble'))
+            return
+
         self.setIdle()
-        picture = self._cap.getPicture()
-        if self._rotation is not None:
-            picture = picture.transpose(self._rotation)
-        byte_data = BytesIO()
-        picture.save(byte_data, format='jpeg')
-        self._pictures.append(byte_data)
+        with self._comm.trace('capture'):
+            data, orientation = self._getPictureBytes()
         self.setActive()
 
+        with self._comm.trace('transpose'):
+            data, orientation = self._orientPicture(data, orientation)
+        index = state.num_picture - 1
+        thumbnail = self._resizer.submit(
+            self._traced, 'thumbnail', self._makeThumbnail, data,
+            self._layout.slots[index], orientation, self._preset)
+        self._collage_tasks.append(self._assembler.submit(
+            self._traced, 'paste', self._addToCollage, index, thumbnail))
+
+        byte_data = BytesIO(data)
+
         if self._is_keep_pictures:
             self._comm.send(Workers.WORKER,
                             StateMachine.CameraEvent('capture', byte_data))
 
-        if state.num_picture < self._pic_dims.totalNumPictures:
+        if state.num_picture < self._layout.numShots:
             self._comm.send(Workers.MASTER,
                             StateMachine.CameraEvent('countdown'))
         else:
             self._comm.send(Workers.MASTER,
                             StateMachine.CameraEvent('assemble'))
 
+    def _orientPicture(self, data, orientation):
+
+        orientation = rotate_orientation(orientation, self._angle)
+
+        # Rotate in the DCT domain for consumers ignoring EXIF orientation
+        if orientation not in (None, 1) and self._is_lossless_rotation:
+            rotated = rotate_lossless(data, orientation_angles[orientation])
+            if rotated is not None:
+                return rotated, 1
+
+        # Otherwise keep the encoded picture and only tag the rotation
+        if orientation is not None:
+            tagged = set_orientation(data, orientation)
+            if tagged is not None:
+                return tagged, orientation
+
+        logging.debug('Cannot tag orientation, re-encoding picture')
+        picture = Image.open(BytesIO(data))
+        if self._rotation is not None:
+            picture = picture.transpose(self._rotation)
+        byte_data = BytesIO()
+        picture.save(byte_data, format='jpeg', **self._preset.shotParams)
+        return byte_data.getvalue(), 1
+
+    def captureBurst(self):
+
+        use_preview = self._is_burst_preview and self._cap.hasPreview
+        if not use_preview:
+            self.setIdle()
+
+        # Frames are downscaled in the background while the next ones are
+        # taken. At most two frames are kept at full size at any time.
+        deadline = time.monotonic()
+        for i in range(self._burst_frames):
+            now = time.monotonic()
+            if deadline > now:
+                time.sleep(deadline - now)
+            deadline = max(deadline + self._burst_interval / 1000, now)
+
+            if use_preview:
+                with self._comm.trace('capture'):
+                    frame = self._getPreview()
+                transpose = self._rotation
+            else:
+                with self._comm.trace('capture'):
+                    frame, orientation = self._getPictureBytes()
+                transpose = orientation_transpose(
+                    rotate_orientation(orientation, self._angle))
+
+            if len(self._collage_tasks) > 2:
+                self._collage_tasks[-2].result()
+            self._collage_tasks.append(self._assembler.submit(
+                self._addToAnimation, frame, transpose))
+
+        if not use_preview:
+            self.setActive()
+
     def assemblePicture(self):
 
         self.setIdle()
 
-        picture = self._template.copy()
-        for i in range(self._pic_dims.totalNumPictures):
-            shot = Image.open(self._pictures[i])
-            resized = shot.resize(self._pic_dims.thumbnailSize)
-            picture.paste(resized, self._pic_dims.thumbnailOffset[i])
+        # Wait for the last shot to be added, raises errors of any step
+        metrics = self._comm.metrics
+        with metrics.time('assembly_seconds', stage='assemble'):
+            with self._comm.trace('assemble'):
+                for task in self._collage_tasks:
+                    task.result()
 
         byte_data = BytesIO()
-        picture.save(byte_data, format='jpeg')
+        with metrics.time('assembly_seconds', stage='encode'):
+            with self._comm.trace('encode'):
+                if self._capture_mode == 'single':
+                    self._template.applyOverlay(self._collage)
+                    self._collage.save(byte_data, format='jpeg',
+                                       **self._preset.outputParams)
+                else:
+                    self._saveAnimation(byte_data)
+        metrics.count('pictures_total', mode=self._capture_mode)
         self._comm.send(Workers.MASTER,
                         StateMachine.CameraEvent('review', byte_data))
-        self._pictures = []
+        self._collage = None
+        self._collage_tasks = []
+        self._animation = []
+
+    def _traced(self, name, func, *args):
+
+        with self._comm.metrics.time('assembly_seconds', stage=name):
+            with self._comm.trace(name):
+                return func(*args)
+
+    def _saveAnimation(self, byte_data):
+
+        frames = self._animation
+        if self._capture_mode == 'boomerang':
+            frames = frames + frames[-2:0:-1]
+
+        logging.info('Encoding animation of %d frames', len(frames))
+        frames[0].save(byte_data, format=self._animation_format,
+                       save_all=True, append_images=frames[1:],
+                       duration=self._burst_interval, loop=0)
+
+    def _startCollage(self):
+
+        if self._capture_mode == 'single':
+            self._collage = self._template.canvas.copy()
+            self._thumbnails = {}
+            self._num_pasted = 0
+        else:
+            self._animation = []
+
+    def _addToAnimation(self, frame, transpose):
+
+        # Only downscaled frames are kept to bound memory use
+        size = (self._burst_size, self._burst_size)
+        if isinstance(frame, bytes):
+            frame = draft_image(Image.open(BytesIO(frame)), size)
+        elif not isinstance(frame, Image.Image):
+            frame = Image.fromarray(frame)
+
+        frame = frame.convert('RGB')
+        frame.thumbnail(size, self._preset.resample)
+        if transpose is not None:
+            frame = frame.transpose(transpose)
+        self._animation.append(frame)
+
+    def _addToCollage(self, index, thumbnail):
+
+        # Thumbnails are pasted in z-order as soon as all slots below are
+        # filled, which is the order of shots unless slots overlap
+        self._thumbnails[index] = thumbnail.result()
+        order = self._layout.pasteOrder
+        while (self._num_pasted < len(order) and
+               order[self._num_pasted] in self._thumbnails):
+            slot_index = order[self._num_pasted]
+            self._collage.paste(self._thumbnails.pop(slot_index),
+                                self._layout.slots[slot_index].offset)
+            self._num_pasted += 1
+
+    @staticmethod
+    def _makeThumbnail(data, slot, orientation, preset):
+
+        # Shots are decoded only here, cropped and downscaled and then
+        # turned upright and rotated for the slot in a single step
+        orientation = rotate_orientation(orientation, slot.rotation)
+        angle = orientation_angles[orientation]
+        size = slot.size if angle in (0, 180) else slot.size[::-1]
+
+        shot = Image.open(BytesIO(data))
+        box = slot.cropBox(shot.size, angle)
+        full_size = shot.size
+        shot = draft_image(shot, tuple(
+            int(size[i] * full_size[i] / (box[i + 2] - box[i])) + 1
+            for i in range(2)))
+        scale = shot.size[0] / full_size[0]
+        box = tuple(b * scale for b in box)
+
+        resized = preset.resize(shot, size, box)
+        transpose = orientation_transpose(orientation)
+        if transpose is not None:
+            resized = resized.transpose(transpose)
+        return resized
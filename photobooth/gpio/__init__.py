@@ -18,6 +18,7 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+import threading
 from colorsys import hsv_to_rgb
 from time import sleep
 
@@ -27,6 +28,13 @@ from ..Threading import Workers
 
 class Gpio:
 
+    # States that are handled or end the idle animation
+    subscriptions = (StateMachine.IdleState, StateMachine.GreeterState,
+                     StateMachine.CountdownState, StateMachine.CaptureState,
+                     StateMachine.AssembleState, StateMachine.ReviewState,
+                     StateMachine.PostprocessState, StateMachine.ErrorState,
+                     StateMachine.TeardownState)
+
     def __init__(self, config, comm):
 
         super().__init__()
@@ -36,6 +44,8 @@ class Gpio:
 
         self._is_trigger = False
         self._is_enabled = config.getBool('Gpio', 'enable')
+        self._idle_thread = None
+        self._idle_halt = threading.Event()
         self._countdown_time = config.getInt('Photobooth', 'countdown_time')
 
         self.initGpio(config)
@@ -69,10 +79,13 @@ class Gpio:
         for state in self._comm.iter(Workers.GPIO):
             self.handleState(state)
 
+        self.stopIdle()
         return True
 
     def handleState(self, state):
 
+        self.stopIdle()
+
         if isinstance(state, StateMachine.IdleState):
             self.showIdle()
         elif isinstance(state, StateMachine.GreeterState):
@@ -146,13 +159,28 @@ class Gpio:
 
         self.enableTrigger()
 
+        # Animate in a separate thread, so this process sleeps in the queue
+        # until the next state arrives instead of polling it
         if self._is_enabled:
-            h, s, v = 0, 1, 1
-            while self._comm.empty(Workers.GPIO):
-                h = (h + 1) % 360
-                rgb = hsv_to_rgb(h / 360, s, v)
-                self.setRgbColor(*rgb)
-                sleep(0.1)
+            self._idle_halt.clear()
+            self._idle_thread = threading.Thread(target=self.animateIdle,
+                                                 daemon=True)
+            self._idle_thread.start()
+
+    def animateIdle(self):
+
+        h, s, v = 0, 1, 1
+        while not self._idle_halt.wait(0.25):
+            h = (h + 2.5) % 360
+            rgb = hsv_to_rgb(h / 360, s, v)
+            self.setRgbColor(*rgb)
+
+    def stopIdle(self):
+
+        if self._idle_thread is not None:
+            self._idle_halt.set()
+            self._idle_thread.join()
+            self._idle_thread = None
 
     def showGreeter(self):
 
@@ -18,15 +18,19 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 from .. import printer
+from ..Metrics import Metrics
 from ..util import lookup_and_import
 
 
 class GuiPostprocessor:
 
-    def __init__(self, config):
+    def __init__(self, config, metrics=None):
 
         super().__init__()
 
+        if metrics is None:
+            metrics = Metrics()
+
         self._get_task_list = []
         self._do_task_list = []
 
@@ -37,10 +41,10 @@ class GuiPostprocessor:
             pdf = config.getBool('Printer', 'pdf')
             if config.getBool('Printer', 'confirmation'):
                 self._get_task_list.append(
-                    PrintPostprocess(module, paper_size, pdf))
+                    PrintPostprocess(module, paper_size, pdf, metrics))
             else:
                 self._do_task_list.append(
-                    PrintPostprocess(module, paper_size, pdf))
+                    PrintPostprocess(module, paper_size, pdf, metrics))
 
     def get(self, picture):
 
@@ -100,13 +104,20 @@ class PostprocessItem:
 
 class PrintPostprocess(PostprocessTask):
 
-    def __init__(self, printer_module, paper_size, is_pdf, **kwargs):
+    def __init__(self, printer_module, paper_size, is_pdf, metrics,
+                 **kwargs):
 
         super().__init__(**kwargs)
 
         Printer = lookup_and_import(printer.modules, printer_module, 'printer')
         self._printer = Printer(paper_size, is_pdf)
+        self._metrics = metrics
+
+    def print(self, picture):
+
+        with self._metrics.time('print_seconds'):
+            self._printer.print(picture)
 
     def get(self, picture):
 
-        return PostprocessItem('Print', lambda: self._printer.print(picture))
+        return PostprocessItem('Print', lambda: self.print(picture))
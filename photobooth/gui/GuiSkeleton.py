@@ -18,10 +18,13 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 from .. import StateMachine
+from ..Threading import LatestMessage, Workers
 
 
 class GuiSkeleton:
 
+    subscriptions = (StateMachine.State, )
+
     def __init__(self, communicator):
 
         super().__init__()
@@ -75,8 +78,20 @@ class GuiSkeleton:
 
         raise NotImplementedError()
 
+    def dropLatest(self, message):
+
+        raise NotImplementedError()
+
     def handleState(self, state):
 
+        if isinstance(state, LatestMessage):
+            # Skip messages that were superseded while the Gui was busy
+            message = self._comm.recvLatest(Workers.GUI, state)
+            if message is None:
+                self.dropLatest(state.message)
+                return
+            state = message
+
         if isinstance(state, StateMachine.CameraEvent):
             self.updateCountdown(state)
         elif isinstance(state, StateMachine.ErrorState):
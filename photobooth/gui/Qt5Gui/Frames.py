@@ -162,12 +162,13 @@ class CaptureMessage(QtWidgets.QFrame):
 
 class PictureMessage(QtWidgets.QFrame):
 
-    def __init__(self, picture):
+    def __init__(self, picture, paint_action=None):
 
         super().__init__()
         self.setObjectName('PictureMessage')
 
         self._picture = picture
+        self._paint_action = paint_action
 
     def _paintPicture(self, painter):
 
@@ -188,6 +189,11 @@ class PictureMessage(QtWidgets.QFrame):
         self._paintPicture(painter)
         painter.end()
 
+        # Only the first paint is reported
+        if self._paint_action is not None:
+            self._paint_action()
+            self._paint_action = None
+
 
 class WaitMessage(QtWidgets.QFrame):
 
@@ -231,7 +237,7 @@ class WaitMessage(QtWidgets.QFrame):
 
 class CountdownMessage(QtWidgets.QFrame):
 
-    def __init__(self, time, action):
+    def __init__(self, time, action, paint_action=None):
 
         super().__init__()
         self.setObjectName('CountdownMessage')
@@ -239,6 +245,7 @@ class CountdownMessage(QtWidgets.QFrame):
         self._step_size = 50
         self._value = time * (1000 // self._step_size)
         self._action = action
+        self._paint_action = paint_action
         self._picture = None
 
         self._initProgressBar(time)
@@ -313,6 +320,9 @@ class CountdownMessage(QtWidgets.QFrame):
 
         painter.end()
 
+        if self.picture is not None and self._paint_action is not None:
+            self._paint_action()
+
 
 class PostprocessMessage(Widgets.TransparentOverlay):
 
@@ -570,6 +580,17 @@ class Settings(QtWidgets.QFrame):
         preview.setChecked(self._cfg.getBool('Photobooth', 'show_preview'))
         self.add('Photobooth', 'show_preview', preview)
 
+        preview_fps = QtWidgets.QSpinBox()
+        preview_fps.setRange(1, 60)
+        preview_fps.setValue(self._cfg.getInt('Photobooth', 'preview_fps'))
+        self.add('Photobooth', 'preview_fps', preview_fps)
+
+        preview_latency = QtWidgets.QSpinBox()
+        preview_latency.setRange(10, 5000)
+        preview_latency.setValue(self._cfg.getInt('Photobooth',
+                                                  'preview_latency'))
+        self.add('Photobooth', 'preview_latency', preview_latency)
+
         greet_time = QtWidgets.QSpinBox()
         greet_time.setRange(0, 1000)
         greet_time.setValue(self._cfg.getInt('Photobooth', 'greeter_time'))
@@ -597,6 +618,8 @@ class Settings(QtWidgets.QFrame):
 
         layout = QtWidgets.QFormLayout()
         layout.addRow(_('Show preview during countdown:'), preview)
+        layout.addRow(_('Maximum preview frame rate [fps]:'), preview_fps)
+        layout.addRow(_('Preview latency budget [ms]:'), preview_latency)
         layout.addRow(_('Greeter time before countdown [s]:'), greet_time)
         layout.addRow(_('Countdown time [s]:'), count_time)
         layout.addRow(_('Picture display time [s]:'), displ_time)
@@ -631,9 +654,14 @@ class Settings(QtWidgets.QFrame):
 
         self.add('Camera', 'rotation', rotation)
 
+        lossless = QtWidgets.QCheckBox()
+        lossless.setChecked(self._cfg.getBool('Camera', 'lossless_rotation'))
+        self.add('Camera', 'lossless_rotation', lossless)
+
         layout = QtWidgets.QFormLayout()
         layout.addRow(_('Camera module:'), module)
         layout.addRow(_('Camera rotation:'), rotation)
+        layout.addRow(_('Rotate pictures losslessly:'), lossless)
 
         widget = QtWidgets.QWidget()
         widget.setLayout(layout)
@@ -689,6 +717,43 @@ class Settings(QtWidgets.QFrame):
         bg = QtWidgets.QLineEdit(self._cfg.get('Picture', 'background'))
         self.add('Picture', 'background', bg)
 
+        skip_image = QtWidgets.QLineEdit(self._cfg.get('Picture',
+                                                       'skip_image'))
+        self.add('Picture', 'skip_image', skip_image)
+
+        overlay = QtWidgets.QLineEdit(self._cfg.get('Picture', 'overlay'))
+        self.add('Picture', 'overlay', overlay)
+
+        layout_file = QtWidgets.QLineEdit(self._cfg.get('Picture', 'layout'))
+        self.add('Picture', 'layout', layout_file)
+
+        self.preset_vals_ = tuple(camera.presets)
+        cur_preset = self._cfg.get('Picture', 'preset')
+        preset = QtWidgets.QComboBox()
+        for p in self.preset_vals_:
+            preset.addItem(p)
+        idx = [x for x, p in enumerate(self.preset_vals_) if p == cur_preset]
+        preset.setCurrentIndex(idx[0] if len(idx) > 0 else -1)
+        self.add('Picture', 'preset', preset)
+
+        cur_mode = self._cfg.get('Picture', 'capture_mode')
+        capture_mode = QtWidgets.QComboBox()
+        for m in camera.capture_modes:
+            capture_mode.addItem(m)
+        idx = [x for x, m in enumerate(camera.capture_modes) if m == cur_mode]
+        capture_mode.setCurrentIndex(idx[0] if len(idx) > 0 else -1)
+        self.add('Picture', 'capture_mode', capture_mode)
+
+        burst_frames = QtWidgets.QSpinBox()
+        burst_frames.setRange(2, 100)
+        burst_frames.setValue(self._cfg.getInt('Picture', 'burst_frames'))
+        self.add('Picture', 'burst_frames', burst_frames)
+
+        burst_interval = QtWidgets.QSpinBox()
+        burst_interval.setRange(10, 10000)
+        burst_interval.setValue(self._cfg.getInt('Picture', 'burst_interval'))
+        self.add('Picture', 'burst_interval', burst_interval)
+
         lay_num = QtWidgets.QHBoxLayout()
         lay_num.addWidget(num_x)
         lay_num.addWidget(QtWidgets.QLabel('x'))
@@ -728,6 +793,14 @@ class Settings(QtWidgets.QFrame):
         layout.addRow(_('Min. distance border to shots [px]:'), lay_outer_dist)
         layout.addRow(_('Skip pictures:'), skip)
         layout.addRow(_('Background image:'), lay_file)
+        layout.addRow(_('Image for skipped pictures:'), skip_image)
+        layout.addRow(_('Overlay image:'), overlay)
+        layout.addRow(_('Layout file (replaces grid):'), layout_file)
+        layout.addRow(_('Performance preset:'), preset)
+        layout.addRow(_('Capture mode:'), capture_mode)
+        layout.addRow(_('Number of frames in a burst:'), burst_frames)
+        layout.addRow(_('Interval between burst frames [ms]:'),
+                      burst_interval)
 
         widget = QtWidgets.QWidget()
         widget.setLayout(layout)
@@ -950,6 +1023,11 @@ class Settings(QtWidgets.QFrame):
                                                      'password'))
         self.add('UploadWebdav', 'password', password)
 
+        concurrency = QtWidgets.QSpinBox()
+        concurrency.setRange(1, 8)
+        concurrency.setValue(self._cfg.getInt('UploadWebdav', 'concurrency'))
+        self.add('UploadWebdav', 'concurrency', concurrency)
+
         lay_auth = QtWidgets.QHBoxLayout()
         lay_auth.addWidget(use_auth)
         lay_auth.addWidget(QtWidgets.QLabel('Username:'))
@@ -961,6 +1039,7 @@ class Settings(QtWidgets.QFrame):
         layout.addRow(_('Enable WebDAV upload:'), enable)
         layout.addRow(_('URL (folder must exist):'), url)
         layout.addRow(_('Server requires auth:'), lay_auth)
+        layout.addRow(_('Simultaneous uploads:'), concurrency)
 
         widget = QtWidgets.QWidget()
         widget.setLayout(layout)
@@ -981,6 +1060,10 @@ class Settings(QtWidgets.QFrame):
 
         self._cfg.set('Photobooth', 'show_preview',
                       str(self.get('Photobooth', 'show_preview').isChecked()))
+        self._cfg.set('Photobooth', 'preview_fps',
+                      str(self.get('Photobooth', 'preview_fps').text()))
+        self._cfg.set('Photobooth', 'preview_latency',
+                      str(self.get('Photobooth', 'preview_latency').text()))
         self._cfg.set('Photobooth', 'greeter_time',
                       str(self.get('Photobooth', 'greeter_time').text()))
         self._cfg.set('Photobooth', 'countdown_time',
@@ -997,6 +1080,8 @@ class Settings(QtWidgets.QFrame):
                                               'module').currentIndex()][0])
         self._cfg.set('Camera', 'rotation', str(
             self.rot_vals_[self.get('Camera', 'rotation').currentIndex()]))
+        self._cfg.set('Camera', 'lossless_rotation',
+                      str(self.get('Camera', 'lossless_rotation').isChecked()))
 
         self._cfg.set('Picture', 'num_x', self.get('Picture', 'num_x').text())
         self._cfg.set('Picture', 'num_y', self.get('Picture', 'num_y').text())
@@ -1015,6 +1100,20 @@ class Settings(QtWidgets.QFrame):
         self._cfg.set('Picture', 'skip', self.get('Picture', 'skip').text())
         self._cfg.set('Picture', 'background',
                       self.get('Picture', 'background').text())
+        self._cfg.set('Picture', 'skip_image',
+                      self.get('Picture', 'skip_image').text())
+        self._cfg.set('Picture', 'overlay',
+                      self.get('Picture', 'overlay').text())
+        self._cfg.set('Picture', 'layout',
+                      self.get('Picture', 'layout').text())
+        self._cfg.set('Picture', 'preset', self.preset_vals_[
+            self.get('Picture', 'preset').currentIndex()])
+        self._cfg.set('Picture', 'capture_mode', camera.capture_modes[
+            self.get('Picture', 'capture_mode').currentIndex()])
+        self._cfg.set('Picture', 'burst_frames',
+                      self.get('Picture', 'burst_frames').text())
+        self._cfg.set('Picture', 'burst_interval',
+                      self.get('Picture', 'burst_interval').text())
 
         self._cfg.set('Storage', 'basedir',
                       self.get('Storage', 'basedir').text())
@@ -1078,6 +1177,8 @@ class Settings(QtWidgets.QFrame):
                       self.get('UploadWebdav', 'user').text())
         self._cfg.set('UploadWebdav', 'password',
                       self.get('UploadWebdav', 'password').text())
+        self._cfg.set('UploadWebdav', 'concurrency',
+                      self.get('UploadWebdav', 'concurrency').text())
 
         self._cfg.write()
         self._restartAction()
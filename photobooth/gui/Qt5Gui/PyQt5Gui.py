@@ -19,15 +19,22 @@
 
 import logging
 import os
+import time
 
 from PyQt5 import QtCore
 from PyQt5 import QtGui
 from PyQt5 import QtWidgets
 
+try:
+    from PyQt5 import sip
+except ImportError:
+    import sip
+
 from PIL import Image, ImageQt
 
 from ...StateMachine import GuiEvent, TeardownEvent
-from ...Threading import Workers
+from ...camera.CollageLayout import read_layout
+from ...Threading import SharedFrame, Workers
 
 from ..GuiSkeleton import GuiSkeleton
 from ..GuiPostprocessor import GuiPostprocessor
@@ -51,7 +58,9 @@ class PyQt5Gui(GuiSkeleton):
         self._initWorker()
 
         self._picture = None
-        self._postprocess = GuiPostprocessor(self._cfg)
+        self._preview_frame = None
+        self._preview_timestamp = None
+        self._postprocess = GuiPostprocessor(self._cfg, self._comm.metrics)
 
     def run(self):
 
@@ -195,20 +204,76 @@ class PyQt5Gui(GuiSkeleton):
         countdown_time = self._cfg.getInt('Photobooth', 'countdown_time')
         self._setWidget(Frames.CountdownMessage(
             countdown_time,
-            lambda: self._comm.send(Workers.MASTER, GuiEvent('capture'))))
+            lambda: self._comm.send(Workers.MASTER, GuiEvent('capture')),
+            self._previewPainted))
 
     def updateCountdown(self, event):
 
-        picture = Image.open(event.picture)
-        self._gui.centralWidget().picture = ImageQt.ImageQt(picture)
+        if isinstance(event.picture, SharedFrame):
+            # Stale frames are not shown and must not count for the latency
+            if not self._updateSharedPreview(event.picture):
+                return
+        else:
+            picture = Image.open(event.picture)
+            self._gui.centralWidget().picture = ImageQt.ImageQt(picture)
+            self._gui.centralWidget().update()
+
+        self._preview_timestamp = event.timestamp
+
+    def dropLatest(self, event):
+
+        # Hand the buffer of a skipped preview frame back to the camera
+        if isinstance(event.picture, SharedFrame):
+            self._comm.frameRing.release(event.picture)
+
+    def _previewPainted(self):
+
+        # Report the latency from acquisition to display to the camera
+        if self._preview_timestamp is not None:
+            self._comm.reportPreviewLatency(
+                time.monotonic() - self._preview_timestamp)
+            self._preview_timestamp = None
+
+    def _updateSharedPreview(self, frame):
+
+        ring = self._comm.frameRing
+        previous = self._preview_frame
+
+        if previous is not None and frame.seq <= previous.seq:
+            ring.release(frame)
+            return False
+
+        # Wrap the shared buffer without copying. The slot stays ours until
+        # the next frame replaces it on screen.
+        self._preview_view = ring.view(frame)
+        self._gui.centralWidget().picture = QtGui.QImage(
+            sip.voidptr(self._preview_view), *frame.size, 3 * frame.size[0],
+            QtGui.QImage.Format_RGB888)
         self._gui.centralWidget().update()
 
+        self._preview_frame = frame
+        if previous is not None:
+            ring.release(previous)
+
+        return True
+
     def showCapture(self, state):
 
-        num_pic = (self._cfg.getInt('Picture', 'num_x'),
-                   self._cfg.getInt('Picture', 'num_y'))
-        skip = [i for i in self._cfg.getIntList('Picture', 'skip')
-                if 1 <= i and i <= num_pic[0] * num_pic[1]]
+        layout = self._cfg.get('Picture', 'layout')
+
+        # A burst is taken after a single countdown
+        if self._cfg.get('Picture', 'capture_mode') != 'single':
+            num_pic = (1, 1)
+            skip = []
+        elif len(layout) > 0:
+            description = read_layout(layout, os.path.getmtime(layout))
+            num_pic = (len(description['slots']), 1)
+            skip = []
+        else:
+            num_pic = (self._cfg.getInt('Picture', 'num_x'),
+                       self._cfg.getInt('Picture', 'num_y'))
+            skip = [i for i in self._cfg.getIntList('Picture', 'skip')
+                    if 1 <= i and i <= num_pic[0] * num_pic[1]]
         self._setWidget(Frames.CaptureMessage(state.num_picture, *num_pic,
                                               skip))
 
@@ -218,10 +283,16 @@ class PyQt5Gui(GuiSkeleton):
 
     def showReview(self, state):
 
-        picture = Image.open(state.picture)
-        self._picture = ImageQt.ImageQt(picture)
+        with self._comm.trace('decode'):
+            picture = Image.open(state.picture)
+            self._picture = ImageQt.ImageQt(picture)
+
+        start = time.monotonic()
+        tracer = self._comm.tracer
         review_time = self._cfg.getInt('Photobooth', 'display_time') * 1000
-        self._setWidget(Frames.PictureMessage(self._picture))
+        self._setWidget(Frames.PictureMessage(
+            self._picture,
+            lambda: tracer.addSpan('paint', start, time.monotonic())))
         QtCore.QTimer.singleShot(
             review_time,
             lambda: self._comm.send(Workers.MASTER, GuiEvent('postprocess')))
@@ -33,6 +33,8 @@ import multiprocessing as mp
 from . import camera, gui
 from .Config import Config
 from .gpio import Gpio
+from .gui.GuiSkeleton import GuiSkeleton
+from .Metrics import MetricsExporter
 from .util import lookup_and_import
 from .StateMachine import Context, ErrorEvent
 from .Threading import Communicator, Workers
@@ -176,7 +178,25 @@ def run(argv, is_run):
     # Load configuration
     config = Config('photobooth.cfg')
 
-    comm = Communicator()
+    # Preview frames are never larger than the Gui
+    comm = Communicator((config.getInt('Gui', 'width'),
+                         config.getInt('Gui', 'height')))
+
+    if config.getBool('Trace', 'enable'):
+        comm.enableTracing(config.get('Trace', 'basedir'))
+
+    if config.getBool('Metrics', 'enable'):
+        comm.enableMetrics()
+        exporter = MetricsExporter(config, comm)
+    else:
+        exporter = None
+
+    # Broadcast states only to processes that handle them
+    comm.subscribe(Workers.CAMERA, camera.Camera.subscriptions)
+    comm.subscribe(Workers.GUI, GuiSkeleton.subscriptions)
+    comm.subscribe(Workers.GPIO, Gpio.subscriptions)
+    comm.subscribe(Workers.WORKER, Worker.subscriptions)
+
     context = Context(comm, is_run)
 
     # Initialize processes: We use five processes here:
@@ -191,6 +211,9 @@ def run(argv, is_run):
     for proc in procs:
         proc.start()
 
+    if exporter is not None:
+        exporter.start()
+
     # Enter main loop
     exit_code = mainloop(comm, context)
 
@@ -198,6 +221,11 @@ def run(argv, is_run):
     for proc in procs:
         proc.join()
 
+    if exporter is not None:
+        exporter.stop()
+
+    comm.close()
+
     logging.debug('All processes joined, returning code {}'. format(exit_code))
 
     return exit_code
@@ -18,6 +18,7 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 import importlib
+import os
 
 from PIL import Image
 
@@ -40,6 +41,26 @@ def lookup_and_import(module_list, name, package=None):
         return getattr(import_module, result[1])
 
 
+def cache_dir():
+    """Return the directory for cached data, create it if necessary"""
+
+    base = os.environ.get('XDG_CACHE_HOME',
+                          os.path.join(os.path.expanduser('~'), '.cache'))
+    path = os.path.join(base, 'photobooth')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def draft_image(image, size):
+    """Configure the decoder of a not yet loaded JPEG image to downscale
+    by 1/2, 1/4 or 1/8 while decoding, as far as the result stays at least
+    as large as size. Other images are returned unchanged.
+    """
+
+    image.draft('RGB', size)
+    return image
+
+
 def pickle_image(image):
 
     if image is None:
@@ -29,14 +29,14 @@ class PictureList:
     of taken and previously existing pictures.
     """
 
-    def __init__(self, basename):
+    def __init__(self, basename, suffix='.jpg'):
         """Initialize filenames to the given basename and search for
         existing files. Set the counter accordingly.
         """
 
         # Set basename and suffix
         self._basename = basename
-        self.suffix = '.jpg'
+        self.suffix = suffix
         self.count_width = 5
 
         self.findExistingFiles()
@@ -59,8 +59,8 @@ class PictureList:
 
         # Print initial infos
         logging.info('Number of last existing file: %d', self.counter)
-        logging.info('Saving pictures as "%s%s.%s"', self.basename,
-                     self.count_width * 'X', 'jpg')
+        logging.info('Saving pictures as "%s%s%s"', self.basename,
+                     self.count_width * 'X', self.suffix)
 
     @property
     def basename(self):
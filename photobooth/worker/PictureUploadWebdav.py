@@ -29,7 +29,8 @@ class PictureUploadWebdav(WorkerTask):
 
     def __init__(self, config):
 
-        super().__init__()
+        super().__init__(
+            concurrency=config.getInt('UploadWebdav', 'concurrency'))
 
         self._baseurl = config.get('UploadWebdav', 'url')
         if config.getBool('UploadWebdav', 'use_auth'):
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Photobooth - a flexible photo booth software
+# Copyright (C) 2018  Balthasar Reuter <photobooth at re - web dot eu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .. import StateMachine
+from ..Threading import Workers
+
+
+class TaskScheduler:
+    """Runs worker tasks in background threads.
+
+    Tasks of each type have their own queue and thread pool, sized by the
+    concurrency of the task. A slow task, e.g., sending a mail, therefore
+    never delays tasks of another type, e.g., saving the next picture to
+    disk. Errors are reported to the master like errors of the worker
+    process.
+    """
+
+    def __init__(self, comm):
+
+        super().__init__()
+
+        self._comm = comm
+        self._pools = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def submit(self, task, picture, filename):
+
+        name = type(task).__name__
+        if name not in self._pools:
+            self._pools[name] = ThreadPoolExecutor(
+                max_workers=task.concurrency)
+            self._pending[name] = 0
+
+        self._updatePending(name, 1)
+        self._pools[name].submit(self._run, task, name, picture, filename,
+                                 self._comm.tracer.traceId, time.monotonic())
+
+    def shutdown(self):
+        """Wait for all queued tasks to finish"""
+
+        for name, pool in self._pools.items():
+            if self._pending[name] > 0:
+                logging.info('TaskScheduler: Waiting for %d %s task(s)',
+                             self._pending[name], name)
+            pool.shutdown()
+
+        self._comm.flushMetrics()
+
+    def _updatePending(self, name, change):
+
+        with self._lock:
+            self._pending[name] += change
+            pending = self._pending[name]
+
+        self._comm.metrics.gauge('worker_pending_tasks', pending, task=name)
+
+    def _run(self, task, name, picture, filename, trace_id, submitted):
+
+        tracer = self._comm.tracer
+        metrics = self._comm.metrics
+
+        start = time.monotonic()
+        tracer.addSpan('queue wait', submitted, start, trace_id, task=name)
+        metrics.observe('worker_task_wait_seconds', start - submitted,
+                        task=name)
+
+        try:
+            task.do(picture, filename)
+        except Exception as e:
+            logging.exception('TaskScheduler: %s failed', name)
+            metrics.count('worker_task_failures_total', task=name)
+            self._comm.send(Workers.MASTER,
+                            StateMachine.ErrorEvent('Worker', str(e)))
+        finally:
+            end = time.monotonic()
+            tracer.addSpan(name, start, end, trace_id)
+            metrics.observe('worker_task_seconds', end - start, task=name)
+            self._updatePending(name, -1)
+            # Tasks finish after the message was handled, report them now
+            self._comm.flushMetrics()
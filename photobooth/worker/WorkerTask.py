@@ -20,10 +20,17 @@
 
 class WorkerTask:
 
-    def __init__(self, **kwargs):
+    def __init__(self, concurrency=1, **kwargs):
 
         assert not kwargs
 
+        self._concurrency = concurrency
+
+    @property
+    def concurrency(self):
+
+        return self._concurrency
+
     def do(self, picture):
 
         raise NotImplementedError()
@@ -28,19 +28,28 @@ from .PictureList import PictureList
 from .PictureMailer import PictureMailer
 from .PictureSaver import PictureSaver
 from .PictureUploadWebdav import PictureUploadWebdav
+from .TaskScheduler import TaskScheduler
 
 
 class Worker:
 
+    subscriptions = (StateMachine.ReviewState, StateMachine.TeardownState,
+                     StateMachine.CameraEvent)
+
     def __init__(self, config, comm):
 
         self._comm = comm
+        self._scheduler = TaskScheduler(comm)
 
         # Picture list for assembled pictures
         path = os.path.join(config.get('Storage', 'basedir'),
                             config.get('Storage', 'basename'))
         basename = strftime(path, localtime())
-        self._pic_list = PictureList(basename)
+        if config.get('Picture', 'capture_mode') == 'single':
+            suffix = '.jpg'
+        else:
+            suffix = '.' + config.get('Picture', 'animation_format')
+        self._pic_list = PictureList(basename, suffix)
 
         # Picture list for individual shots
         path = os.path.join(config.get('Storage', 'basedir'),
@@ -78,6 +87,7 @@ class Worker:
         for state in self._comm.iter(Workers.WORKER):
             self.handleState(state)
 
+        self._scheduler.shutdown()
         return True
 
     def handleState(self, state):
@@ -98,10 +108,11 @@ class Worker:
 
     def doPostprocessTasks(self, picture, filename):
 
+        # Tasks run in the background, saving comes first in the list
         for task in self._postprocess_tasks:
-            task.do(picture, filename)
+            self._scheduler.submit(task, picture, filename)
 
     def doPictureTasks(self, picture, filename):
 
         for task in self._picture_tasks:
-            task.do(picture, filename)
+            self._scheduler.submit(task, picture, filename)
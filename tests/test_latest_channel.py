@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Photobooth - a flexible photo booth software
+# Copyright (C) 2018  Balthasar Reuter <photobooth at re - web dot eu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import multiprocessing as mp
+import threading
+
+from io import BytesIO
+
+from photobooth.StateMachine import CameraEvent
+from photobooth.Threading import Communicator, LatestMessage, Workers
+
+# Larger than the buffer of a pipe, so that writing blocks until it is read
+payload_size = 200 * 1024
+
+
+def _send_previews(comm, count):
+
+    for i in range(count):
+        data = BytesIO(bytes([i]) * payload_size)
+        comm.sendLatest(Workers.GUI, 'preview', CameraEvent('preview', data))
+
+
+def _receive(comm, count, timeout=10):
+
+    received = []
+    reader = threading.Thread(
+        target=lambda: received.extend(comm.recv(Workers.GUI)
+                                       for _ in range(count)),
+        daemon=True)
+    reader.start()
+    reader.join(timeout)
+    assert not reader.is_alive(), 'Receiving large messages blocked'
+    return received
+
+
+def test_large_messages_across_processes():
+
+    comm = Communicator()
+    sender = mp.Process(target=_send_previews, args=(comm, 3))
+    sender.start()
+
+    received = _receive(comm, 3)
+    sender.join(10)
+    assert sender.exitcode == 0
+
+    assert all(isinstance(m, LatestMessage) for m in received)
+    messages = [comm.recvLatest(Workers.GUI, m) for m in received]
+    assert messages[:2] == [None, None]
+    assert len(messages[2].picture.getbuffer()) == payload_size
+    assert messages[2].picture.getbuffer()[0] == 2
+    assert comm.latestStats(Workers.GUI, 'preview') == (3, 2)
+
+
+def test_newest_message_is_delivered():
+
+    comm = Communicator()
+    _send_previews(comm, 1)
+    message = comm.recvLatest(Workers.GUI, _receive(comm, 1)[0])
+
+    assert message is not None
+    assert message.name == 'preview'
+    assert comm.latestStats(Workers.GUI, 'preview') == (1, 0)
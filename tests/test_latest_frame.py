@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Photobooth - a flexible photo booth software
+# Copyright (C) 2018  Balthasar Reuter <photobooth at re - web dot eu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+
+from photobooth.camera.LatestFrame import LatestFrame
+
+
+def test_newest_frame_is_returned_once():
+
+    latest = LatestFrame()
+    latest.put(1)
+    latest.put(2)
+    assert latest.get() == 2
+
+    timer = threading.Timer(0.05, latest.put, (3, ))
+    timer.start()
+    assert latest.get() == 3
+    timer.join()
+
+
+def test_reset_discards_previous_frame():
+
+    latest = LatestFrame()
+    latest.put('before release')
+    latest.reset()
+
+    timer = threading.Timer(0.05, latest.put, ('after reopen', ))
+    timer.start()
+    assert latest.get() == 'after reopen'
+    timer.join()
+
+
+def test_error_is_raised_until_reset():
+
+    latest = LatestFrame()
+    latest.fail(RuntimeError('stream failed'))
+    try:
+        latest.get()
+    except RuntimeError:
+        pass
+    else:
+        assert False, 'Error not raised'
+
+    latest.reset()
+    latest.put(1)
+    assert latest.get() == 1
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Photobooth - a flexible photo booth software
+# Copyright (C) 2018  Balthasar Reuter <photobooth at re - web dot eu>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from io import BytesIO
+
+from PIL import Image
+
+from photobooth.camera.Orientation import set_orientation
+
+_make_tag = 0x010f
+_orientation_tag = 0x0112
+
+
+def _jpeg(exif=None):
+
+    picture = Image.new('RGB', (64, 48), (255, 0, 0))
+    data = BytesIO()
+    if exif is None:
+        picture.save(data, format='jpeg')
+    else:
+        picture.save(data, format='jpeg', exif=exif.tobytes())
+    return data.getvalue()
+
+
+def _exif_without_orientation():
+
+    exif = Image.Exif()
+    exif[_make_tag] = 'Camera'
+    exif[0x0110] = 'Model'
+    return exif
+
+
+def _read_exif(data):
+
+    return Image.open(BytesIO(data)).getexif()
+
+
+def test_normal_orientation_without_tag_keeps_data():
+
+    data = _jpeg(_exif_without_orientation())
+    assert set_orientation(data, 1) == data
+
+
+def test_orientation_is_added_to_exif_without_tag():
+
+    data = set_orientation(_jpeg(_exif_without_orientation()), 6)
+
+    assert data is not None
+    exif = _read_exif(data)
+    assert exif[_orientation_tag] == 6
+    assert exif[_make_tag] == 'Camera'
+    assert Image.open(BytesIO(data)).size == (64, 48)
+
+
+def test_existing_orientation_tag_is_patched():
+
+    exif = _exif_without_orientation()
+    exif[_orientation_tag] = 3
+    data = set_orientation(_jpeg(exif), 8)
+
+    assert _read_exif(data)[_orientation_tag] == 8
+
+
+def test_exif_segment_is_inserted_without_exif():
+
+    data = set_orientation(_jpeg(), 6)
+
+    assert _read_exif(data)[_orientation_tag] == 6
+    assert set_orientation(_jpeg(), 1) == _jpeg()